@@ -0,0 +1,194 @@
+"""Monthly archival of closed orders.
+
+Closed orders (Recharged / Failed recharges, Completed / Cancelled product
+orders with their product_order_lines) older than the configured horizon are
+moved out of the hot tables into per-month tables, e.g. ``orders_2024_01``, in
+a separate database file (``recharge_archive.db`` next to ``recharge.db``).
+The hot database keeps only recent and open orders, so its working set stays
+in the page cache.
+
+client_stats and daily_recharge_stats keep counting archived orders: their
+delete triggers are skipped while archiving (see migration 11), and
+``rollups.py`` rebuilds from hot and archived orders together.
+
+Usage: python archive.py [--horizon-days N] [--vacuum] [--db PATH]
+"""
+import argparse
+import os
+import sqlite3
+from datetime import date, timedelta
+
+from db import DEFAULT_DB_PATH, get_manager
+from settings import archive_horizon_days
+
+ALIAS = "archive"
+CLOSED_STATUSES = {
+    "orders": ("Recharged", "Failed"),
+    "product_orders": ("Completed", "Cancelled"),
+}
+# Tables whose rows belong to an order and move with it: {source: [(table, order key)]}.
+ORDER_LINES = {
+    "product_orders": [("product_order_lines", "order_id")],
+}
+
+
+def archive_path(db_path=DEFAULT_DB_PATH):
+    root, ext = os.path.splitext(db_path)
+    return f"{root}_archive{ext or '.db'}"
+
+
+def attach(db_path=DEFAULT_DB_PATH, create=False):
+    """Attach the archive database to ``db_path``'s connections.
+
+    Returns False (and attaches nothing) if there is no archive yet, unless
+    ``create`` is set.
+    """
+    manager = get_manager(db_path)
+    if manager.is_attached(ALIAS):
+        return True
+    path = archive_path(db_path)
+    if not create and not os.path.exists(path):
+        return False
+    manager.attach(ALIAS, path)
+    with manager.transaction() as c:
+        c.execute(f"""
+            CREATE TABLE IF NOT EXISTS {ALIAS}.partitions (
+                name TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                month TEXT NOT NULL,
+                rows INTEGER NOT NULL DEFAULT 0,
+                archived_at TEXT
+            )
+        """)
+    return True
+
+
+def partitions(source, db_path=DEFAULT_DB_PATH):
+    """Return the archive tables holding ``source`` rows, oldest month first."""
+    if not attach(db_path):
+        return []
+    with get_manager(db_path).reader() as conn:
+        return [name for (name,) in conn.execute(
+            f"SELECT name FROM {ALIAS}.partitions WHERE source = ? ORDER BY month", (source,)
+        )]
+
+
+def history_sql(source, where, order_by, partition_names):
+    """Return SQL reading ``source`` rows matching ``where`` from the hot table
+    and every partition in ``partition_names``, ordered by ``order_by``.
+
+    ``where``'s parameters must be bound once per partition, hot table first.
+    """
+    selects = [f"SELECT * FROM {source} WHERE {where}"]
+    selects += [f"SELECT * FROM {ALIAS}.{name} WHERE {where}" for name in partition_names]
+    return "SELECT * FROM (" + " UNION ALL ".join(selects) + f") ORDER BY {order_by}"
+
+
+def _create_partition(c, source, name, index="client_id, created_at"):
+    """Create the partition if needed and return the hot table's column list.
+
+    Rows are copied by column name, so a partition created before a hot
+    column was dropped keeps working (the dropped column is left NULL).
+    """
+    # Same columns as the hot table; ids are kept, so re-running an archive
+    # that was interrupted between its two databases cannot duplicate rows.
+    columns = c.execute(f"PRAGMA main.table_info({source})").fetchall()
+    definitions = ", ".join(
+        f"{col[1]} {col[2]}" + (" PRIMARY KEY" if col[5] else "") for col in columns
+    )
+    c.execute(f"CREATE TABLE IF NOT EXISTS {ALIAS}.{name} ({definitions})")
+    index_name = f"idx_{name}_{index.replace(', ', '_')}"
+    c.execute(f"CREATE INDEX IF NOT EXISTS {ALIAS}.{index_name} ON {name} ({index})")
+    return ", ".join(col[1] for col in columns)
+
+
+def _record_partition(c, name, source, month, rows):
+    c.execute(f"""
+        INSERT INTO {ALIAS}.partitions (name, source, month, rows, archived_at)
+        VALUES (?, ?, ?, ?, datetime('now'))
+        ON CONFLICT (name) DO UPDATE SET rows = rows + excluded.rows, archived_at = excluded.archived_at
+    """, (name, source, month, rows))
+
+
+def archive_orders(horizon_days=None, db_path=DEFAULT_DB_PATH, today=None):
+    """Move closed orders created before ``today - horizon_days`` into the archive.
+
+    SQLite commits each attached file on its own, so a single transaction
+    spanning both could lose orders in a crash between the two commits. The
+    copy is committed to the archive first; a second transaction then deletes
+    from the hot tables only the rows the archive holds. A rerun after a crash
+    in between copies nothing twice (ids are kept, INSERT OR IGNORE) and
+    finishes the deletes.
+
+    Returns {partition name: rows moved}.
+    """
+    if horizon_days is None:
+        horizon_days = archive_horizon_days()
+    cutoff = ((today or date.today()) - timedelta(days=horizon_days)).strftime("%Y-%m-%d")
+    attach(db_path, create=True)
+    copied = []   # (source, partition, [(table, key, partition)], closed, params)
+    with get_manager(db_path).transaction() as c:
+        for source, statuses in CLOSED_STATUSES.items():
+            closed = f"status IN ({', '.join('?' * len(statuses))}) AND created_at >= ? AND created_at < ?"
+            months = [month for (month,) in c.execute(
+                f"SELECT DISTINCT substr(created_at, 1, 7) FROM {source} "
+                f"WHERE status IN ({', '.join('?' * len(statuses))}) AND created_at < ?",
+                (*statuses, cutoff)
+            )]
+            for month in months:
+                name = f"{source}_{month.replace('-', '_')}"
+                year, mon = map(int, month.split("-"))
+                next_month = f"{year + mon // 12:04d}-{mon % 12 + 1:02d}"
+                params = (*statuses, month, min(next_month, cutoff))
+                columns = _create_partition(c, source, name)
+                c.execute(f"INSERT OR IGNORE INTO {ALIAS}.{name} ({columns}) "
+                          f"SELECT {columns} FROM main.{source} WHERE {closed}", params)
+                _record_partition(c, name, source, month, c.rowcount)
+                lines = []
+                for table, key in ORDER_LINES.get(source, ()):
+                    lines_name = f"{table}_{month.replace('-', '_')}"
+                    lines_columns = _create_partition(c, table, lines_name, index=key)
+                    c.execute(f"INSERT OR IGNORE INTO {ALIAS}.{lines_name} ({lines_columns}) "
+                              f"SELECT {lines_columns} FROM main.{table} "
+                              f"WHERE {key} IN (SELECT id FROM main.{source} WHERE {closed})", params)
+                    _record_partition(c, lines_name, table, month, c.rowcount)
+                    lines.append((table, key, lines_name))
+                copied.append((source, name, lines, closed, params))
+
+    moved = {}
+    with get_manager(db_path).transaction() as c:
+        c.execute("UPDATE archive_state SET active = 1")
+        for source, name, lines, closed, params in copied:
+            for table, key, lines_name in lines:
+                c.execute(f"DELETE FROM main.{table} WHERE id IN (SELECT id FROM {ALIAS}.{lines_name})")
+                moved[lines_name] = c.rowcount
+            c.execute(f"DELETE FROM main.{source} WHERE {closed} AND id IN (SELECT id FROM {ALIAS}.{name})",
+                      params)
+            moved[name] = c.rowcount
+        c.execute("UPDATE archive_state SET active = 0")
+    return moved
+
+
+def vacuum(db_path=DEFAULT_DB_PATH):
+    """Shrink the hot database file after archiving. Takes an exclusive lock."""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive closed orders older than the horizon.")
+    parser.add_argument("--horizon-days", type=int, help="default: archive.horizon_days in config.json")
+    parser.add_argument("--vacuum", action="store_true", help="shrink the hot database afterwards")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    args = parser.parse_args()
+
+    moved = archive_orders(args.horizon_days, args.db)
+    for name, rows in moved.items():
+        print(f"{name}: {rows} rows")
+    print(f"Archived {sum(moved.values())} rows into {archive_path(args.db)}.")
+    if args.vacuum:
+        vacuum(args.db)
+        print(f"Vacuumed {args.db}.")
@@ -0,0 +1,44 @@
+"""Static branding assets, loaded once per process.
+
+Files are cached together with their modification time, so a rerun costs one
+stat() per asset and an edited file is picked up without a restart. With
+Streamlit's static file serving on (.streamlit/config.toml), ``url()`` points
+the browser at ``app/static/...`` and it caches the file itself; otherwise
+the file is inlined as a data URI that is encoded only once.
+"""
+import streamlit as st
+import base64
+import mimetypes
+import os
+
+STATIC_DIR = "static"
+STATIC_URL = "app/static"
+
+_cache = {}
+
+
+def load(path, parse=bytes):
+    """Return ``parse(contents of path)``, re-reading only when its mtime changes."""
+    mtime = os.stat(path).st_mtime_ns
+    entry = _cache.get((path, parse))
+    if entry is None or entry[0] != mtime:
+        with open(path, "rb") as f:
+            entry = _cache[(path, parse)] = (mtime, parse(f.read()))
+    return entry[1]
+
+
+def b64encode(data):
+    return base64.b64encode(data).decode()
+
+
+def data_uri(path):
+    mime = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    return f"data:{mime};base64,{load(path, b64encode)}"
+
+
+def url(path):
+    """Return a URL for the asset at ``path`` (relative to the app directory)."""
+    relative = os.path.relpath(path, STATIC_DIR)
+    if st.get_option("server.enableStaticServing") and not relative.startswith(".."):
+        return f"{STATIC_URL}/{relative.replace(os.sep, '/')}"
+    return data_uri(path)
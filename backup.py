@@ -0,0 +1,217 @@
+"""Online backups of recharge.db.
+
+A snapshot copies the live database with SQLite's backup API, PAGES_PER_STEP
+pages at a time with a short pause between steps, from inside one read
+transaction. Under WAL that read never blocks the app's writer, and pinning
+it means writes made meanwhile do not restart the copy. The copy is checked
+with PRAGMA integrity_check, gzip-compressed to
+``backups/<name>-YYYYmmdd-HHMMSS.db.gz`` and old snapshots beyond the
+retention count are deleted.
+
+``start()`` runs snapshots on a daemon thread every ``backup.interval_hours``
+(config.json); the archive database is backed up with the hot one.
+
+Usage: python backup.py snapshot [--db PATH]
+       python backup.py list [--db PATH]
+       python backup.py verify SNAPSHOT
+       python backup.py restore SNAPSHOT [--db PATH]
+"""
+import argparse
+import glob
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import archive
+from db import DEFAULT_DB_PATH
+from migrations import migrate
+from settings import backup_settings
+
+PAGES_PER_STEP = 256
+STEP_SLEEP = 0.005          # seconds between steps
+
+log = logging.getLogger(__name__)
+
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def _copy(src, dst_path):
+    """Copy the open connection ``src`` into a new database file at ``dst_path``."""
+    dst = sqlite3.connect(dst_path)
+    try:
+        src.execute("BEGIN")
+        src.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()  # pin the read snapshot
+        try:
+            src.backup(dst, pages=PAGES_PER_STEP, sleep=STEP_SLEEP)
+        finally:
+            src.execute("COMMIT")
+        # Snapshots are single files; WAL is switched back on by the app.
+        dst.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        dst.close()
+
+
+def _check(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        conn.close()
+    if result != "ok":
+        raise RuntimeError(f"Integrity check failed for {path}: {result}")
+
+
+def _snapshot_prefix(db_path, backup_dir):
+    return os.path.join(backup_dir, os.path.splitext(os.path.basename(db_path))[0] + "-")
+
+
+def snapshots(db_path=DEFAULT_DB_PATH, backup_dir=None):
+    """Return ``db_path``'s snapshots, oldest first."""
+    backup_dir = backup_dir or backup_settings()["dir"]
+    prefix = _snapshot_prefix(db_path, backup_dir)
+    return sorted(path for path in glob.glob(prefix + "*.db.gz")
+                  if os.path.basename(path)[len(os.path.basename(prefix)):-len(".db.gz")].replace("-", "").isdigit())
+
+
+def snapshot(db_path=DEFAULT_DB_PATH, backup_dir=None, keep=None):
+    """Write a verified, compressed snapshot of ``db_path`` and apply retention.
+
+    Returns the snapshot's path.
+    """
+    settings = backup_settings()
+    backup_dir = backup_dir or settings["dir"]
+    keep = settings["keep"] if keep is None else keep
+    os.makedirs(backup_dir, exist_ok=True)
+    target = _snapshot_prefix(db_path, backup_dir) + datetime.now().strftime("%Y%m%d-%H%M%S") + ".db.gz"
+
+    fd, tmp = tempfile.mkstemp(suffix=".db", dir=backup_dir)
+    os.close(fd)
+    try:
+        src = sqlite3.connect(db_path, isolation_level=None)
+        try:
+            _copy(src, tmp)
+        finally:
+            src.close()
+        _check(tmp)
+        with open(tmp, "rb") as f, gzip.open(target + ".tmp", "wb", compresslevel=6) as out:
+            shutil.copyfileobj(f, out, 1024 * 1024)
+        os.replace(target + ".tmp", target)
+    finally:
+        os.remove(tmp)
+
+    for old in snapshots(db_path, backup_dir)[:-keep] if keep > 0 else []:
+        os.remove(old)
+    return target
+
+
+def _decompress(snapshot_path, dst_path):
+    with gzip.open(snapshot_path, "rb") as f, open(dst_path, "wb") as out:
+        shutil.copyfileobj(f, out, 1024 * 1024)
+
+
+def verify(snapshot_path):
+    """Decompress ``snapshot_path`` to a temporary file and integrity-check it."""
+    fd, tmp = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        _decompress(snapshot_path, tmp)
+        _check(tmp)
+    finally:
+        os.remove(tmp)
+
+
+def restore(snapshot_path, db_path=DEFAULT_DB_PATH):
+    """Replace the contents of ``db_path`` with ``snapshot_path``.
+
+    The snapshot is verified first and copied in with the backup API, so it
+    is safe with the app running; it then migrates the restored database to
+    the current schema. Restart the app afterwards so it reconnects to the
+    restored schema.
+    """
+    fd, tmp = tempfile.mkstemp(suffix=".db", dir=os.path.dirname(os.path.abspath(db_path)))
+    os.close(fd)
+    try:
+        _decompress(snapshot_path, tmp)
+        _check(tmp)
+        src = sqlite3.connect(tmp, isolation_level=None)
+        dst = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+        try:
+            src.backup(dst, pages=PAGES_PER_STEP)
+            dst.execute("PRAGMA journal_mode=WAL")
+            migrate(dst)
+        finally:
+            src.close()
+            dst.close()
+    finally:
+        os.remove(tmp)
+
+
+# --- Background snapshots ---
+
+def _due_in(db_path, interval):
+    # Seconds until the next snapshot is due, so restarting the app does not
+    # take a snapshot every time.
+    existing = snapshots(db_path)
+    if not existing:
+        return 0
+    return max(os.path.getmtime(existing[-1]) + interval - time.time(), 0)
+
+
+def _run(db_path, interval):
+    while True:
+        time.sleep(_due_in(db_path, interval))
+        for path in (db_path, archive.archive_path(db_path)):
+            if not os.path.exists(path):
+                continue
+            try:
+                started = time.perf_counter()
+                target = snapshot(path)
+                log.info("Backed up %s to %s in %.1fs", path, target, time.perf_counter() - started)
+            except Exception:
+                log.exception("Backup of %s failed", path)
+        if _due_in(db_path, interval) == 0:  # the snapshot failed; retry later
+            time.sleep(interval)
+
+
+def start(db_path=DEFAULT_DB_PATH):
+    """Start the background snapshot thread, once per process.
+
+    Does nothing if ``backup.interval_hours`` is 0.
+    """
+    global _thread
+    interval_hours = backup_settings()["interval_hours"]
+    if not interval_hours:
+        return
+    with _thread_lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_run, args=(db_path, interval_hours * 3600), name="backup", daemon=True)
+            _thread.start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshot, verify or restore the database.")
+    parser.add_argument("command", choices=["snapshot", "list", "verify", "restore"])
+    parser.add_argument("snapshot", nargs="?", help="snapshot file for verify / restore")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    args = parser.parse_args()
+
+    if args.command == "snapshot":
+        print(f"Wrote {snapshot(args.db)}.")
+    elif args.command == "list":
+        for path in snapshots(args.db):
+            print(f"{path}  {os.path.getsize(path) / 1e6:.1f} MB")
+    elif not args.snapshot:
+        parser.error(f"{args.command} needs a SNAPSHOT")
+    elif args.command == "verify":
+        verify(args.snapshot)
+        print(f"{args.snapshot} is ok.")
+    else:
+        restore(args.snapshot, args.db)
+        print(f"Restored {args.db} from {args.snapshot}.")
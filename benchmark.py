@@ -0,0 +1,271 @@
+"""Time the data loading behind every page of the app at several data volumes.
+
+Each case calls the same repository functions the page calls, with the read
+cache cleared first, so it measures what a rerun costs when the data has just
+changed (a cache hit costs next to nothing). Every case is run REPEATS times
+for the p50 / p95 wall time, then once more under tracemalloc for the peak
+Python memory it allocates, which includes the DataFrames it builds.
+
+Scales are seeded with seed.py into --data-dir on first use and reused after
+that. Each scale runs in a child process pointed at its database through
+RECHARGE_DB, so caches and memory do not leak from one scale into the next.
+
+Results are written as JSON. With --baseline FILE they are compared against
+an earlier run and the command exits non-zero if any case's median time or
+peak memory grew by more than --tolerance (p95 is reported but too noisy
+to gate on); --save-baseline FILE records a new one.
+Baselines are only comparable on the same machine.
+
+Usage: python benchmark.py [--scales small medium large] [--repeat N]
+           [--baseline FILE] [--save-baseline FILE] [--out FILE]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+import seed
+
+DATA_DIR = "bench_data"
+REPEATS = 20
+WARMUP = 2
+TOLERANCE = 0.25            # allowed relative growth before a case counts as a regression
+MIN_TIME_DELTA_MS = 1.0     # ...and absolute growth, so timer noise on tiny cases is ignored
+MIN_MEMORY_DELTA_KIB = 256
+
+
+# --- Cases ---
+
+def _context(conn):
+    """Pick representative ids and cursors from the seeded database."""
+    def one(sql):
+        return conn.execute(sql).fetchone()
+    client_id, = one("SELECT id FROM clients ORDER BY id LIMIT 1 OFFSET (SELECT COUNT(*) / 2 FROM clients)")
+    order_id, created_at = one("SELECT id, created_at FROM orders ORDER BY id LIMIT 1 OFFSET (SELECT COUNT(*) / 2 FROM orders)")
+    product_id, name = one("SELECT id, name FROM products ORDER BY id LIMIT 1 OFFSET (SELECT COUNT(*) / 2 FROM products)")
+    operator_id, = one("SELECT id FROM operators WHERE name = 'Jio'")
+    return {"client_id": client_id, "order_id": order_id, "order_cursor": (created_at, order_id),
+            "product_id": product_id, "product_cursor": (name, product_id), "operator_id": operator_id}
+
+
+def cases(ctx):
+    """Return {page: [(case, callable)]}; every callable does what the page does on a rerun."""
+    import lucky_draw
+    import repository
+
+    today = date.today()
+    month_start = today.replace(day=1)
+    next_month_start = (month_start + timedelta(days=32)).replace(day=1)
+    last_month = (today - timedelta(days=30)).strftime("%Y-%m-%d")
+    orders_where, orders_params = repository.order_filters("Recharged", last_month, today.strftime("%Y-%m-%d"))
+    client_where, client_params = repository.order_filters(client_id=ctx["client_id"])
+    grid_where, grid_params = repository.product_filters("Mobiles", "Android", 1000, 50000, in_stock=True)
+
+    def page(source, tables, select="*", where=(), params=(), sort="created_at", descending=True, after=None,
+             limit=51):
+        repository.count_rows(source, tables, where, params)
+        return repository.read_page(source, tables, select, where, params, sort, descending, after, limit)
+
+    def product_grid():
+        products = page("products", ["products"], repository.PRODUCT_COLUMNS, grid_where, grid_params, "name",
+                        False, limit=13)
+        return repository.product_images(products["id"], cover_only=True)
+
+    return {
+        "Dashboard": [
+            ("total clients", repository.count_clients),
+            ("recharge totals", repository.recharge_totals_by_status),
+            ("recharge trend", lambda: repository.recharge_trend(last_month)),
+            ("clients due this week", lambda: repository.clients_due_between(
+                today.strftime("%Y-%m-%d"), (today + timedelta(days=7)).strftime("%Y-%m-%d"))),
+            ("pending recharge orders", repository.pending_orders),
+            ("pending product orders", repository.pending_product_orders),
+            ("pending due recharges", lambda: repository.pending_due_clients(
+                today.strftime("%Y-%m-%d"), month_start.strftime("%Y-%m-%d"), next_month_start.strftime("%Y-%m-%d"))),
+        ],
+        "Clients": [
+            ("first page", lambda: page(repository.CLIENT_SOURCE, repository.CLIENT_TABLES,
+                                        repository.CLIENT_COLUMNS, sort="name", descending=False)),
+            ("search", lambda: repository.search_clients("Kumar")),
+            ("short search", lambda: repository.search_clients("98")),
+            ("profile", lambda: repository.get_client_profile(ctx["client_id"])),
+            ("recharge history", lambda: repository.client_orders(ctx["client_id"])),
+        ],
+        "Recharge Orders": [
+            ("first page", lambda: page("orders", ["orders"], repository.ORDER_COLUMNS)),
+            ("deep page", lambda: page("orders", ["orders"], repository.ORDER_COLUMNS, after=ctx["order_cursor"])),
+            ("by status and date", lambda: page("orders", ["orders"], repository.ORDER_COLUMNS,
+                                                orders_where, orders_params)),
+            ("by client", lambda: page("orders", ["orders"], repository.ORDER_COLUMNS, client_where, client_params)),
+            ("fetch", lambda: repository.get_order(ctx["order_id"])),
+        ],
+        "Product Orders": [
+            ("first page", lambda: page("product_orders", repository.PRODUCT_ORDER_TABLES,
+                                        repository.PRODUCT_ORDER_COLUMNS)),
+            ("by client", lambda: page("product_orders", repository.PRODUCT_ORDER_TABLES,
+                                       repository.PRODUCT_ORDER_COLUMNS, where=client_where, params=client_params)),
+            ("order lines", lambda: repository.product_order_lines(ctx["order_id"])),
+        ],
+        "Recharge Catalogue": [
+            ("plans by operator", lambda: repository.plans_by_operator(ctx["operator_id"])),
+            ("all plans", repository.list_plans),
+        ],
+        "Product Catalogue": [
+            ("categories", lambda: (repository.product_categories(), repository.product_subcategories("Mobiles"))),
+            ("table page", lambda: page("products", ["products"], repository.PRODUCT_COLUMNS, sort="name",
+                                        descending=False, after=ctx["product_cursor"])),
+            ("filtered grid", product_grid),
+            ("product", lambda: (repository.get_product(ctx["product_id"]),
+                                 repository.product_images([ctx["product_id"]]))),
+        ],
+        "Lucky Draw": [
+            ("eligible clients", lambda: lucky_draw.eligible_summary({"exclude_winners_days": 30})),
+            ("eligible active clients", lambda: lucky_draw.eligible_summary(
+                {"active_this_month": True, "weighting": "recharge_volume"})),
+            ("recent winners", repository.recent_lucky_draw_winners),
+        ],
+    }
+
+
+def measure(fn, repeat):
+    """Return p50 / p95 milliseconds and peak KiB of ``fn`` with a cold read cache."""
+    import repository
+
+    for _ in range(WARMUP):
+        repository.clear_cache()
+        fn()
+    times = []
+    for _ in range(repeat):
+        repository.clear_cache()
+        gc.collect()  # so one sample does not pay for collecting another's garbage
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    repository.clear_cache()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    times.sort()
+    return {
+        "p50_ms": round(statistics.median(times), 3),
+        "p95_ms": round(times[min(int(len(times) * 0.95), len(times) - 1)], 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def run_scale(db_path, repeat):
+    """Benchmark every case against ``db_path``. Runs in the child process."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    ctx = _context(conn)
+    counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+              for table in ("clients", "recharge_plans", "products", "orders", "product_orders", "product_order_lines")}
+    conn.close()
+    results = {}
+    for page_name, page_cases in cases(ctx).items():
+        for case, fn in page_cases:
+            results[f"{page_name}: {case}"] = measure(fn, repeat)
+        results[f"{page_name}: whole page"] = measure(lambda: [fn() for _, fn in page_cases], repeat)
+    return {"rows": counts, "cases": results}
+
+
+# --- Comparison ---
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Return (scale, case, metric, before, after) for every regression."""
+    regressions = []
+    for scale, current in results["scales"].items():
+        before_cases = baseline.get("scales", {}).get(scale, {}).get("cases", {})
+        for case, after in current["cases"].items():
+            before = before_cases.get(case)
+            if before is None:
+                continue
+            for metric, floor in (("p50_ms", MIN_TIME_DELTA_MS), ("peak_kib", MIN_MEMORY_DELTA_KIB)):
+                if after[metric] > before[metric] * (1 + tolerance) and after[metric] - before[metric] > floor:
+                    regressions.append((scale, case, metric, before[metric], after[metric]))
+    return regressions
+
+
+def print_results(results, baseline=None):
+    for scale, current in results["scales"].items():
+        before_cases = (baseline or {}).get("scales", {}).get(scale, {}).get("cases", {})
+        rows = ", ".join(f"{count} {table}" for table, count in current["rows"].items())
+        print(f"\n{scale} ({rows})")
+        print(f"  {'case':<42} {'p50 ms':>9} {'p95 ms':>9} {'peak KiB':>10}  vs baseline p50")
+        for case, m in current["cases"].items():
+            change = ""
+            if case in before_cases and before_cases[case]["p50_ms"]:
+                change = f"{m['p50_ms'] / before_cases[case]['p50_ms'] - 1:+.0%}"
+            print(f"  {case:<42} {m['p50_ms']:>9.2f} {m['p95_ms']:>9.2f} {m['peak_kib']:>10.0f}  {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark page data loading at several data volumes.")
+    parser.add_argument("--scales", nargs="+", choices=list(seed.SCALES), default=list(seed.SCALES))
+    parser.add_argument("--data-dir", default=DATA_DIR, help="where seeded databases are kept")
+    parser.add_argument("--repeat", type=int, default=REPEATS)
+    parser.add_argument("--out", help="write this run's results to a JSON file")
+    parser.add_argument("--baseline", help="compare against a JSON baseline; exit 1 on regressions")
+    parser.add_argument("--save-baseline", help="write this run's results as a new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--run-scale", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_scale:
+        json.dump(run_scale(args.run_scale, args.repeat), sys.stdout)
+        return 0
+
+    results = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.node(),
+            "repeat": args.repeat,
+        },
+        "scales": {},
+    }
+    os.makedirs(args.data_dir, exist_ok=True)
+    for scale in args.scales:
+        db_path = os.path.join(args.data_dir, f"{scale}.db")
+        if not os.path.exists(db_path):
+            print(f"Seeding {db_path}...", flush=True)
+            seed.seed(scale, db_path)
+        print(f"Benchmarking {scale}...", flush=True)
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--run-scale", db_path, "--repeat", str(args.repeat)],
+            env={**os.environ, "RECHARGE_DB": db_path}, capture_output=True, text=True, check=True,
+        )
+        results["scales"][scale] = json.loads(child.stdout)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"\nWrote {path}.")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for scale, case, metric, before, after in regressions:
+            print(f"REGRESSION {scale} / {case}: {metric} {before} -> {after}")
+        if regressions:
+            return 1
+        print(f"\nNo regressions against {args.baseline}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
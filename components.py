@@ -0,0 +1,174 @@
+import sqlite3
+import streamlit as st
+from datetime import date, timedelta
+
+import exporter
+import importer
+import repository
+
+# --- Reusable page components ---
+
+
+def _plain(value):
+    # DataFrame cells come back as numpy scalars, which sqlite3 cannot bind.
+    return value.item() if hasattr(value, "item") else value
+
+
+def paginated_table(key, source, tables, select="*", where=(), params=(), sort_options=("created_at", "id"),
+                    page_size=50, transform=None, empty_message="No rows found.", render=st.dataframe):
+    """Show one keyset-paginated page of ``source`` with sort and prev/next controls.
+
+    Filtering and sorting happen in SQL; only the visible page and a row count
+    are fetched. ``transform`` may reshape the page before ``render`` displays
+    it. Returns the page as a DataFrame.
+    """
+    col_sort, col_dir, col_size = st.columns(3)
+    sort = col_sort.selectbox("Sort by", list(sort_options), key=f"{key}_sort")
+    descending = col_dir.selectbox("Order", ["Descending", "Ascending"], key=f"{key}_order") == "Descending"
+    page_size = col_size.selectbox("Rows per page", [page_size, page_size * 2, page_size * 4], key=f"{key}_size")
+
+    # Cursors of the pages visited so far; the last one is the current page.
+    signature = (source, tuple(where), tuple(params), sort, descending, page_size)
+    if st.session_state.get(f"{key}_signature") != signature:
+        st.session_state[f"{key}_signature"] = signature
+        st.session_state[f"{key}_cursors"] = [None]
+    cursors = st.session_state[f"{key}_cursors"]
+
+    total = repository.count_rows(source, tables, where, params)
+    if total == 0:
+        st.info(empty_message)
+        return None
+
+    page = repository.read_page(source, tables, select, where, params, sort, descending,
+                                after=cursors[-1], limit=page_size + 1)
+    has_next = len(page) > page_size
+    page = page.head(page_size)
+
+    start = (len(cursors) - 1) * page_size
+    st.caption(f"Showing {start + 1}–{start + len(page)} of {total}")
+    render(transform(page) if transform else page)
+
+    col_prev, col_next = st.columns(2)
+    col_prev.button("◀ Previous", key=f"{key}_prev", disabled=len(cursors) == 1, on_click=cursors.pop)
+    if has_next:
+        last = page.iloc[-1]
+        next_cursor = (_plain(last[sort]), _plain(last["id"]))
+        col_next.button("Next ▶", key=f"{key}_next", on_click=cursors.append, args=(next_cursor,))
+    else:
+        col_next.button("Next ▶", key=f"{key}_next", disabled=True)
+    return page
+
+
+def order_filters(key, statuses):
+    """Render status / date range / client filters and return (where, params)."""
+    col_status, col_dates, col_client = st.columns(3)
+    status = col_status.selectbox("Status", ["All"] + list(statuses), key=f"{key}_status")
+    dates = col_dates.date_input("Created between", value=(), key=f"{key}_dates")
+    client_id = col_client.number_input("Client ID (0 = all)", min_value=0, step=1, key=f"{key}_client")
+
+    start = end = None
+    if len(dates) == 2:
+        start = dates[0].strftime("%Y-%m-%d")
+        end = (dates[1] + timedelta(days=1)).strftime("%Y-%m-%d")
+    return repository.order_filters(
+        status=None if status == "All" else status, start=start, end=end, client_id=client_id or None
+    )
+
+
+def product_filters(key):
+    """Render category / subcategory / price / stock filters and return (where, params)."""
+    col_category, col_subcategory, col_min, col_max, col_stock = st.columns(5)
+    category = col_category.selectbox("Category", ["All"] + repository.product_categories(), key=f"{key}_category")
+    subcategories = repository.product_subcategories(category) if category != "All" else []
+    subcategory = col_subcategory.selectbox("Subcategory", ["All"] + subcategories, key=f"{key}_subcategory",
+                                            disabled=category == "All")
+    min_price = col_min.number_input("Min price (0 = any)", min_value=0.0, step=100.0, key=f"{key}_min_price")
+    max_price = col_max.number_input("Max price (0 = any)", min_value=0.0, step=100.0, key=f"{key}_max_price")
+    in_stock = col_stock.checkbox("In stock only", key=f"{key}_in_stock")
+    return repository.product_filters(
+        category=None if category == "All" else category,
+        subcategory=None if subcategory == "All" else subcategory,
+        min_price=min_price or None, max_price=max_price or None, in_stock=in_stock,
+    )
+
+
+def bulk_import(kind):
+    """Upload a CSV/Excel file and import it as ``kind`` (see importer.SPECS)."""
+    spec = importer.SPECS[kind]
+    caption = ("Columns: " + ", ".join(f"**{name}**" if required else name for name, _, required in spec["columns"])
+               + " (bold = required). One row per line; the first line holds the column names.")
+    if spec["conflict"]:
+        caption += (f" Rows with an existing {spec['conflict']} update that row; blank or missing columns keep "
+                    "their stored values.")
+    st.caption(caption)
+    upload = st.file_uploader("CSV or Excel file", type=["csv", "xlsx"], key=f"{kind}_import_file")
+    if upload is None or not st.button("Import", key=f"{kind}_import"):
+        return
+    progress = st.progress(0.0, text="Importing…")
+    try:
+        result = importer.import_file(
+            kind, upload, upload.name,
+            on_progress=lambda rows, fraction: progress.progress(fraction, text=f"{rows} rows read…"),
+        )
+    except (ValueError, sqlite3.Error) as e:
+        st.error(f"Import failed: {e}")
+        return
+    progress.progress(1.0, text=f"{result['read']} rows read")
+    st.success(f"Imported {result['imported']} of {result['read']} rows.")
+    errors = result["errors"]
+    if not errors.empty:
+        st.warning(f"{errors['line'].nunique()} rows were skipped.")
+        st.dataframe(errors, hide_index=True)
+        st.download_button("Download errors (CSV)", errors.to_csv(index=False), file_name=f"{kind}_import_errors.csv",
+                           key=f"{kind}_import_errors")
+
+
+EXPORT_MIME = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+
+def export_button(kind, where=(), params=()):
+    """Offer ``kind`` (see exporter.EXPORTS), filtered by ``where``, as a download.
+
+    The file is only generated when the button is clicked, streaming rows
+    from SQLite in chunks.
+    """
+    col_format, col_download = st.columns(2)
+    fmt = col_format.selectbox("Format", exporter.FORMATS, key=f"{kind}_export_format")
+    col_download.download_button(
+        f"⬇️ Download {fmt.upper()}",
+        data=lambda: exporter.export_bytes(kind, fmt, where, params),
+        file_name=f"{kind}_{date.today():%Y-%m-%d}.{fmt}",
+        mime=EXPORT_MIME[fmt],
+        key=f"{kind}_export",
+        on_click="ignore",
+    )
+
+
+def operator_select(label="Operator", current=None, key=None, required=False):
+    """Select box over the operators reference table; returns the chosen operator_id.
+
+    Unless ``required``, "None" is offered too and returns None.
+    """
+    operators = repository.operators()
+    names = dict(zip(operators["id"].map(_plain), operators["name"]))
+    options = list(names) if required else [None] + list(names)
+    current = _plain(current) if current is not None and current == current else None
+    index = options.index(current) if current in options else 0
+    return st.selectbox(label, options, index=index, key=key,
+                        format_func=lambda operator_id: "None" if operator_id is None else names[operator_id])
+
+
+def audience_options():
+    """Target groups for WhatsApp messages (see outbox.audience())."""
+    return ["All", "Premium"] + repository.client_groups()
+
+
+def outbox_progress(kind):
+    """Show the latest ``kind`` campaigns and how far their delivery has got."""
+    progress = repository.outbox_progress(kind)
+    if progress.empty:
+        st.info("Nothing sent yet.")
+        return
+    st.dataframe(progress, hide_index=True)
+    if progress["pending"].sum():
+        st.caption("Messages are sent by the outbox worker (`python outbox.py worker`); refresh to update.")
@@ -1,68 +1,195 @@
+import os
+import queue
 import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
 
-def get_connection(db_path="recharge.db"):
-    conn = sqlite3.connect(db_path, check_same_thread=False)
-    c = conn.cursor()
-
-    # --- Create tables if not exist ---
-    c.execute('''CREATE TABLE IF NOT EXISTS clients (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT,
-        phone TEXT UNIQUE,
-        group_name TEXT,
-        operator TEXT,
-        plan_amount REAL,
-        recharge_day INTEGER,
-        premium BOOLEAN DEFAULT 0,
-        notes TEXT,
-        lucky_draw_wins INTEGER DEFAULT 0,
-        referred BOOLEAN DEFAULT 0,
-        referred_by_name TEXT,
-        referred_by_phone TEXT
-    )''')
-
-    c.execute('''CREATE TABLE IF NOT EXISTS recharge_plans (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT,
-        data TEXT,
-        voice TEXT,
-        sms TEXT,
-        validity INTEGER,
-        operator TEXT,
-        price REAL,
-        description TEXT
-    )''')
-
-    c.execute('''CREATE TABLE IF NOT EXISTS products (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT,
-        category TEXT,
-        subcategory TEXT,
-        price REAL,
-        stock INTEGER,
-        image_paths TEXT,
-        description TEXT
-    )''')
-
-    c.execute('''CREATE TABLE IF NOT EXISTS orders (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        client_id INTEGER,
-        amount REAL,
-        discount REAL,
-        commission REAL,
-        status TEXT,
-        created_at TEXT
-    )''')
-
-    c.execute('''CREATE TABLE IF NOT EXISTS product_orders (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        client_id INTEGER,
-        product_id INTEGER,
-        quantity INTEGER,
-        amount REAL,
-        status TEXT,
-        created_at TEXT
-    )''')
-
-    conn.commit()
-    return conn, c
\ No newline at end of file
+from migrations import migrate
+
+# RECHARGE_DB points the app and tools at another database, e.g. a seeded
+# scratch copy for benchmark.py.
+DEFAULT_DB_PATH = os.environ.get("RECHARGE_DB", "recharge.db")
+
+# Applied to every connection. WAL lets readers keep going while a write is in
+# progress, and NORMAL sync is durable under WAL except on power loss.
+PRAGMAS = {
+    "synchronous": "NORMAL",
+    "cache_size": -16000,       # KiB, i.e. ~16 MB of page cache per connection
+    "mmap_size": 268435456,     # 256 MB memory-mapped reads
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,       # ms to wait on a lock before "database is locked"
+}
+# Read-only connections kept open per database. Checking out waits once all
+# of them are in use.
+READER_POOL_SIZE = 8
+
+
+_WRITE_ACTIONS = (sqlite3.SQLITE_INSERT, sqlite3.SQLITE_UPDATE, sqlite3.SQLITE_DELETE)
+
+
+class ConnectionManager:
+    """Hands out pooled read-only connections and a single writer.
+
+    Readers are checked out of a bounded pool for the length of a ``with``
+    block, so no two threads share one at a time. Streamlit runs each rerun on
+    a new thread; pooling rather than keeping a connection per thread lets a
+    connection and its warm page cache outlive the thread that used it. All
+    writes go through ``transaction()``, which serializes them on one
+    connection inside ``BEGIN IMMEDIATE``.
+
+    The manager also keeps a write version per table, bumped whenever a
+    committed transaction inserted, updated or deleted rows in it (directly or
+    from a trigger). ``table_versions()`` exposes them for cache keys.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        # Most recently returned first, so the warmest page cache is reused.
+        self._readers = queue.LifoQueue()
+        self._reader_count = 0
+        self._readers_lock = threading.Lock()
+        self._write_lock = threading.RLock()
+
+        self._versions = Counter()
+        self._versions_lock = threading.Lock()
+        self._touched = set()
+        self._attached = {}
+
+        # Statements are not cached on the writer so the authorizer sees every
+        # statement it runs, including ones it has run before.
+        self._writer = self._connect(cached_statements=0)
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.set_authorizer(self._record_write)
+        with self._write_lock:
+            migrate(self._writer)
+
+        # Bumped when another connection (e.g. a script or a second server
+        # process) commits, since we cannot tell which tables it changed.
+        self._epoch = 0
+        self._monitor = self._connect(query_only=True)
+        self._seen_data_version = self._data_version()
+
+    def _connect(self, query_only=False, cached_statements=128):
+        # isolation_level=None: transactions are opened explicitly, never
+        # implicitly by the sqlite3 module.
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None,
+                               cached_statements=cached_statements)
+        for name, value in PRAGMAS.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        if query_only:
+            conn.execute("PRAGMA query_only=1")
+        return conn
+
+    @contextmanager
+    def reader(self):
+        """Check a read-only connection out of the pool for the ``with`` block."""
+        try:
+            conn, attached = self._readers.get_nowait()
+        except queue.Empty:
+            with self._readers_lock:
+                create = self._reader_count < READER_POOL_SIZE
+                if create:
+                    self._reader_count += 1
+            if create:
+                conn, attached = self._connect(query_only=True), set()
+            else:
+                conn, attached = self._readers.get()
+        try:
+            if len(attached) != len(self._attached):
+                for alias, path in list(self._attached.items()):
+                    if alias not in attached:
+                        conn.execute(f"ATTACH DATABASE ? AS {alias}", (path,))
+                        attached.add(alias)
+            yield conn
+        finally:
+            self._readers.put((conn, attached))
+
+    def attach(self, alias, path):
+        """Attach the database file at ``path`` as ``alias`` on every connection.
+
+        The writer attaches it now (ATTACH cannot run inside a transaction, so
+        this waits for any write in progress) and readers on their next use.
+        """
+        with self._write_lock:
+            if alias in self._attached:
+                return
+            self._writer.execute(f"ATTACH DATABASE ? AS {alias}", (path,))
+            self._writer.execute(f"PRAGMA {alias}.journal_mode=WAL")
+            self._attached[alias] = path
+
+    def is_attached(self, alias):
+        return alias in self._attached
+
+    def _record_write(self, action, table, column, db_name, trigger):
+        if action in _WRITE_ACTIONS:
+            self._touched.add(table)
+        return sqlite3.SQLITE_OK
+
+    def _data_version(self):
+        # PRAGMA data_version changes whenever any other connection commits.
+        return self._monitor.execute("PRAGMA data_version").fetchone()[0]
+
+    def _sync_data_version(self):
+        # Caller holds _versions_lock.
+        data_version = self._data_version()
+        if data_version != self._seen_data_version:
+            self._seen_data_version = data_version
+            self._epoch += 1
+
+    @contextmanager
+    def transaction(self):
+        with self._write_lock:
+            self._touched.clear()
+            c = self._writer.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                yield c
+            except BaseException:
+                c.execute("ROLLBACK")
+                raise
+            with self._versions_lock:
+                self._sync_data_version()
+                c.execute("COMMIT")
+                self._versions.update(self._touched)
+                # Our own commit also moves data_version; don't count it as external.
+                self._seen_data_version = self._data_version()
+
+    def table_versions(self, tables):
+        """Return a hashable token that changes whenever any of ``tables`` is written."""
+        with self._versions_lock:
+            self._sync_data_version()
+            return (self._epoch,) + tuple(self._versions[t] for t in tables)
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_manager(db_path=DEFAULT_DB_PATH):
+    # One manager per database per process. Streamlit re-executes the page
+    # script on every interaction but keeps imported modules alive, so the
+    # connections and migrations are set up once at startup.
+    manager = _managers.get(db_path)
+    if manager is None:
+        with _managers_lock:
+            manager = _managers.get(db_path)
+            if manager is None:
+                manager = _managers[db_path] = ConnectionManager(db_path)
+    return manager
+
+
+def get_connection(db_path=DEFAULT_DB_PATH):
+    """Context manager checking out a pooled read-only connection.
+
+    Finish reading (including any cursor) before the block ends.
+    """
+    return get_manager(db_path).reader()
+
+
+def transaction(db_path=DEFAULT_DB_PATH):
+    """Context manager yielding a cursor on the serialized writer connection.
+
+    Commits on success and rolls back if the block raises.
+    """
+    return get_manager(db_path).transaction()
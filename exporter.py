@@ -0,0 +1,178 @@
+"""Streaming export of orders, product orders and clients to CSV or Parquet.
+
+Rows are pulled from a single SELECT with fetchmany(CHUNK_SIZE) and written
+out chunk by chunk, so an export never holds more than one chunk of rows in
+memory. Orders are read in created_at order, which the created_at indexes
+return without a sort step.
+
+Parquet needs pyarrow (pip install pyarrow); CSV works without it.
+
+Usage: python exporter.py {orders|product_orders|clients} OUT.{csv|parquet}
+           [--status S] [--start YYYY-MM-DD] [--end YYYY-MM-DD] [--db PATH]
+"""
+import argparse
+import csv
+import io
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional.
+    pa = pq = None
+
+import repository
+from db import DEFAULT_DB_PATH, get_connection
+
+CHUNK_SIZE = 5000
+FORMATS = ("csv", "parquet") if pa is not None else ("csv",)
+
+# Per export: the FROM clause, the columns as (SQL expression, name, type), the
+# ORDER BY, and whether order filters (status / created_at / client) apply.
+EXPORTS = {
+    "orders": {
+        "source": "orders",
+        "columns": [
+            ("id", "id", "int"),
+            ("client_id", "client_id", "int"),
+            ("amount", "amount", "real"),
+            ("discount", "discount", "real"),
+            ("commission", "commission", "real"),
+            ("status", "status", "text"),
+            ("created_at", "created_at", "text"),
+        ],
+        "order_by": "created_at, id",
+        "filters": True,
+    },
+    # One row per order line, in the old single-product shape (see
+    # migration 17); amount is the line's.
+    "product_orders": {
+        "source": "product_order_details",
+        "columns": [
+            ("id", "id", "int"),
+            ("client_id", "client_id", "int"),
+            ("product_id", "product_id", "int"),
+            ("quantity", "quantity", "int"),
+            ("amount", "amount", "real"),
+            ("status", "status", "text"),
+            ("created_at", "created_at", "text"),
+        ],
+        "order_by": "created_at, id",
+        "filters": True,
+    },
+    "clients": {
+        "source": repository.CLIENT_SOURCE,
+        "columns": [
+            ("c.id", "id", "int"),
+            ("c.name", "name", "text"),
+            ("c.phone", "phone", "text"),
+            ("c.group_name", "group_name", "text"),
+            ("(SELECT name FROM operators WHERE id = c.operator_id)", "operator", "text"),
+            ("c.plan_amount", "plan_amount", "real"),
+            ("c.recharge_day", "recharge_day", "int"),
+            ("c.premium", "premium", "int"),
+            ("c.lucky_draw_wins", "lucky_draw_wins", "int"),
+            ("c.referred", "referred", "int"),
+            ("c.referred_by_name", "referred_by_name", "text"),
+            ("c.referred_by_phone", "referred_by_phone", "text"),
+            ("c.notes", "notes", "text"),
+            ("COALESCE(s.recharge_orders, 0)", "total_recharge_orders", "int"),
+            ("COALESCE(s.product_orders, 0)", "total_product_orders", "int"),
+            ("COALESCE(s.recharged_amount, 0)", "lifetime_recharge_amount", "real"),
+            ("s.last_recharge_at", "last_recharge_at", "text"),
+            ("COALESCE(s.total_commission, 0)", "total_commission", "real"),
+        ],
+        "order_by": "c.id",
+        "filters": False,
+    },
+}
+
+
+def export_sql(kind, where=()):
+    spec = EXPORTS[kind]
+    select = ", ".join(f"{expr} AS {name}" for expr, name, _ in spec["columns"])
+    sql = f"SELECT {select} FROM {spec['source']}"
+    if where:
+        sql += " WHERE " + " AND ".join(f"({clause})" for clause in where)
+    return sql + f" ORDER BY {spec['order_by']}"
+
+
+def iter_chunks(kind, where=(), params=(), db_path=DEFAULT_DB_PATH, chunk_size=CHUNK_SIZE):
+    """Yield lists of up to ``chunk_size`` row tuples from one read cursor."""
+    with get_connection(db_path) as conn:
+        cursor = conn.execute(export_sql(kind, where), tuple(params))
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+
+def write_csv(kind, out, where=(), params=(), db_path=DEFAULT_DB_PATH):
+    """Write the export as CSV to the binary file ``out``; return the row count."""
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerow([name for _, name, _ in EXPORTS[kind]["columns"]])
+    count = 0
+    for rows in iter_chunks(kind, where, params, db_path):
+        writer.writerows(rows)
+        count += len(rows)
+    text.flush()
+    text.detach()  # leave ``out`` open for the caller
+    return count
+
+
+def write_parquet(kind, out, where=(), params=(), db_path=DEFAULT_DB_PATH):
+    """Write the export as Parquet (one row group per chunk); return the row count."""
+    if pa is None:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow).")
+    types = {"int": pa.int64(), "real": pa.float64(), "text": pa.string()}
+    columns = EXPORTS[kind]["columns"]
+    schema = pa.schema([(name, types[type_]) for _, name, type_ in columns])
+    count = 0
+    with pq.ParquetWriter(out, schema, compression="zstd") as writer:
+        for rows in iter_chunks(kind, where, params, db_path):
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array([row[i] for row in rows], type=schema.field(i).type) for i in range(len(columns))],
+                schema=schema,
+            ))
+            count += len(rows)
+        if count == 0:
+            writer.write_table(schema.empty_table())
+    return count
+
+
+def export(kind, fmt, out, where=(), params=(), db_path=DEFAULT_DB_PATH):
+    """Write ``kind`` filtered by ``where``/``params`` to ``out`` as ``fmt``."""
+    write = {"csv": write_csv, "parquet": write_parquet}[fmt]
+    return write(kind, out, where, params, db_path)
+
+
+def export_bytes(kind, fmt, where=(), params=()):
+    """Return the export as bytes, for st.download_button."""
+    out = io.BytesIO()
+    export(kind, fmt, out, where, params)
+    return out.getvalue()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export orders, product orders or clients.")
+    parser.add_argument("kind", choices=sorted(EXPORTS))
+    parser.add_argument("out", help="output file; .parquet for Parquet, anything else for CSV")
+    parser.add_argument("--status")
+    parser.add_argument("--start", help="first created_at day (inclusive)")
+    parser.add_argument("--end", help="created_at day to stop before (exclusive)")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    args = parser.parse_args()
+
+    where, params = (), ()
+    if EXPORTS[args.kind]["filters"]:
+        where, params = repository.order_filters(args.status, args.start, args.end)
+    elif args.status or args.start or args.end:
+        parser.error(f"{args.kind} cannot be filtered by status or date")
+    fmt = "parquet" if args.out.endswith(".parquet") else "csv"
+    with open(args.out, "wb") as f:
+        count = export(args.kind, fmt, f, where, params, args.db)
+    print(f"Wrote {count} rows to {args.out}.")
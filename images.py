@@ -0,0 +1,249 @@
+"""Product image storage.
+
+Uploads are stored once per distinct content, as
+``product_images/originals/<sha256>.<ext>``, so re-uploading a photo (or the
+same photo for two products) reuses the file and names can never collide.
+Thumbnails are re-encoded at THUMBNAIL_SIZES by a background worker and looked
+up through ``thumbnail()``, which is what catalogue pages should display.
+Which product uses which image is recorded in the product_images table.
+
+Usage: python images.py {prune|backfill} [db_path]
+"""
+import hashlib
+import io
+import logging
+import os
+import queue
+import sys
+import threading
+
+from PIL import Image, ImageOps, features
+
+from db import DEFAULT_DB_PATH, get_connection, transaction
+
+IMAGE_DIR = "product_images"
+ORIGINALS_DIR = os.path.join(IMAGE_DIR, "originals")
+THUMBNAIL_DIR = os.path.join(IMAGE_DIR, "thumbs")
+THUMBNAIL_SIZES = (160, 480)    # longest edge, px
+THUMBNAIL_FORMAT = "WEBP" if features.check("webp") else "JPEG"
+THUMBNAIL_QUALITY = 80
+FORMATS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif"}
+
+log = logging.getLogger(__name__)
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+_thumbnails = {}
+
+
+# --- Ingestion ---
+
+def describe(data):
+    """Return the content hash, width and height of image bytes.
+
+    Raises ValueError if ``data`` is not an image Pillow can read.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            width, height = image.size
+            image_format = image.format
+            image.verify()
+    except Exception as e:
+        raise ValueError(f"Not a supported image: {e}") from e
+    if image_format not in FORMATS:
+        raise ValueError(f"Unsupported image format: {image_format}")
+    return {"hash": hashlib.sha256(data).hexdigest(), "format": image_format, "width": width, "height": height}
+
+
+def store(data):
+    """Store uploaded image bytes under their content hash.
+
+    Returns the image's metadata: hash, path, width and height. Thumbnails
+    are queued for the background worker.
+    """
+    image = describe(data)
+    image["path"] = os.path.join(ORIGINALS_DIR, f"{image['hash']}.{FORMATS[image.pop('format')]}")
+    if not os.path.exists(image["path"]):
+        _write(image["path"], data)
+    _enqueue(image["path"])
+    return image
+
+
+def store_uploads(files):
+    """Store Streamlit uploads and return their metadata, without duplicates."""
+    stored = {}
+    for f in files or []:
+        image = store(f.getvalue())
+        stored.setdefault(image["hash"], image)
+    return list(stored.values())
+
+
+def save_product_images(c, product_id, stored):
+    """Replace the images of ``product_id`` with ``stored`` (as returned by
+    ``store_uploads()``), in order, using the caller's transaction cursor."""
+    c.execute("DELETE FROM product_images WHERE product_id = ?", (product_id,))
+    small, large = THUMBNAIL_SIZES[0], THUMBNAIL_SIZES[-1]
+    c.executemany(
+        """INSERT INTO product_images (product_id, sort_order, path, hash, width, height, thumbnail_small, thumbnail_large)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+        [(product_id, sort_order, image["path"], image["hash"], image["width"], image["height"],
+          thumbnail_path(image["path"], small), thumbnail_path(image["path"], large))
+         for sort_order, image in enumerate(stored)]
+    )
+
+
+def _write(path, data):
+    # Write to a temporary name and rename, so readers never see half a file.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+# --- Thumbnails ---
+
+def _thumbnail_key(path):
+    # Stored originals are already named by content; older uploads are keyed
+    # on their path.
+    if os.path.dirname(path) == ORIGINALS_DIR:
+        return os.path.splitext(os.path.basename(path))[0]
+    return hashlib.sha256(path.encode()).hexdigest()
+
+
+def thumbnail_path(path, size):
+    return os.path.join(THUMBNAIL_DIR, f"{_thumbnail_key(path)}_{size}.{FORMATS[THUMBNAIL_FORMAT]}")
+
+
+def make_thumbnails(path, sizes=THUMBNAIL_SIZES):
+    """Decode ``path`` once and write every missing thumbnail size."""
+    missing = [size for size in sizes if not os.path.exists(thumbnail_path(path, size))]
+    if not missing:
+        return
+    with Image.open(path) as image:
+        # draft() lets the JPEG decoder downscale while decoding.
+        image.draft("RGB", (max(missing), max(missing)))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        for size in sorted(missing, reverse=True):
+            image.thumbnail((size, size))
+            out = io.BytesIO()
+            image.save(out, THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY)
+            _write(thumbnail_path(path, size), out.getvalue())
+
+
+def thumbnail(path, size=THUMBNAIL_SIZES[0]):
+    """Return the path of a ``size`` thumbnail of the image at ``path``.
+
+    Thumbnails are normally ready by the time a page asks; if not, the image
+    is resized on the spot. Returns None if the original is missing or
+    unreadable. Hits are cached for the life of the process.
+    """
+    key = (path, size)
+    thumb = _thumbnails.get(key)
+    if thumb is not None:
+        return thumb
+    thumb = thumbnail_path(path, size)
+    if not os.path.exists(thumb):
+        if not os.path.exists(path):
+            return None
+        try:
+            make_thumbnails(path)
+        except Exception:
+            log.exception("Could not make thumbnails of %s", path)
+            return None
+    _thumbnails[key] = thumb
+    return thumb
+
+
+def _enqueue(path):
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run_worker, name="thumbnails", daemon=True)
+            _worker.start()
+    _queue.put(path)
+
+
+def _run_worker():
+    while True:
+        path = _queue.get()
+        try:
+            make_thumbnails(path)
+        except Exception:
+            log.exception("Could not make thumbnails of %s", path)
+        finally:
+            _queue.task_done()
+
+
+def wait():
+    """Block until every queued thumbnail has been written."""
+    _queue.join()
+
+
+# --- Maintenance ---
+
+def referenced_paths(db_path=DEFAULT_DB_PATH):
+    with get_connection(db_path) as conn:
+        return {path for (path,) in conn.execute("SELECT DISTINCT path FROM product_images")}
+
+
+def backfill(db_path=DEFAULT_DB_PATH):
+    """Fill in hash, size and thumbnails of product_images rows that lack them.
+
+    Rows whose file is missing or unreadable are left as they are. Returns the
+    number of rows updated.
+    """
+    with get_connection(db_path) as conn:
+        rows = conn.execute("SELECT DISTINCT path FROM product_images WHERE hash IS NULL").fetchall()
+    updates = []
+    for (path,) in rows:
+        try:
+            with open(path, "rb") as f:
+                image = describe(f.read())
+            make_thumbnails(path)
+        except (OSError, ValueError):
+            log.warning("Skipping unreadable image %s", path)
+            continue
+        updates.append((image["hash"], image["width"], image["height"], thumbnail_path(path, THUMBNAIL_SIZES[0]),
+                        thumbnail_path(path, THUMBNAIL_SIZES[-1]), path))
+    with transaction(db_path) as c:
+        c.executemany(
+            """UPDATE product_images SET hash = ?, width = ?, height = ?, thumbnail_small = ?, thumbnail_large = ?
+               WHERE path = ? AND hash IS NULL""",
+            updates
+        )
+        return c.rowcount
+
+
+def prune(db_path=DEFAULT_DB_PATH):
+    """Delete stored originals no product refers to, and their thumbnails.
+
+    Returns the removed originals. Files outside ORIGINALS_DIR are left alone.
+    """
+    referenced = referenced_paths(db_path)
+    removed = []
+    for name in os.listdir(ORIGINALS_DIR) if os.path.isdir(ORIGINALS_DIR) else []:
+        path = os.path.join(ORIGINALS_DIR, name)
+        if path in referenced or name.endswith(".tmp"):
+            continue
+        for size in THUMBNAIL_SIZES:
+            thumb = thumbnail_path(path, size)
+            if os.path.exists(thumb):
+                os.remove(thumb)
+            _thumbnails.pop((path, size), None)
+        os.remove(path)
+        removed.append(path)
+    return removed
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("prune", "backfill"):
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(2)
+    db_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_DB_PATH
+    if sys.argv[1] == "prune":
+        removed = prune(db_path)
+        print(f"Removed {len(removed)} unreferenced images.")
+    else:
+        print(f"Filled in metadata for {backfill(db_path)} images.")
@@ -0,0 +1,245 @@
+"""Bulk import of clients, recharge plans and products from CSV or Excel.
+
+Files are read CHUNK_SIZE rows at a time. Each chunk is validated and
+normalized column by column with pandas, and its valid rows are written with
+one executemany() inside one transaction. Invalid rows are skipped and
+reported with their line number in the file.
+
+Usage: python importer.py {clients|plans|products} FILE [db_path]
+"""
+import os
+import sys
+
+import pandas as pd
+
+from db import DEFAULT_DB_PATH, get_connection, transaction
+
+CHUNK_SIZE = 1000
+TRUE_VALUES = {"1", "true", "yes", "y"}
+FALSE_VALUES = {"0", "false", "no", "n"}
+PHONE_PATTERN = r"^\+?\d{6,15}$"
+
+# Per import: the target table, its columns as (column, type, required), and
+# the unique column an imported row updates instead of duplicating.
+# Reference types are given by name in the file and stored as the referenced
+# row's id, in <column>_id; names not in the reference table are errors.
+REFERENCES = {"operator": ("operators", "name")}
+SPECS = {
+    "clients": {
+        "table": "clients",
+        "columns": [
+            ("name", "text", True),
+            ("phone", "phone", True),
+            ("group_name", "text", True),
+            ("operator", "operator", False),
+            ("plan_amount", "real", False),
+            ("recharge_day", "day", False),
+            ("premium", "bool", False),
+            ("referred", "bool", False),
+            ("referred_by_name", "text", False),
+            ("referred_by_phone", "text", False),
+            ("notes", "text", False),
+        ],
+        "conflict": "phone",
+    },
+    "plans": {
+        "table": "recharge_plans",
+        "columns": [
+            ("name", "text", True),
+            ("operator", "operator", True),
+            ("price", "real", True),
+            ("validity", "int", False),
+            ("data", "text", False),
+            ("voice", "text", False),
+            ("sms", "text", False),
+            ("description", "text", False),
+        ],
+        "conflict": None,
+    },
+    "products": {
+        "table": "products",
+        "columns": [
+            ("name", "text", True),
+            ("category", "text", False),
+            ("subcategory", "text", False),
+            ("price", "real", True),
+            ("stock", "int", False),
+            ("description", "text", False),
+        ],
+        "conflict": None,
+    },
+}
+
+
+def insert_sql(spec):
+    """Return the INSERT for the spec's rows, binding values by position (?1, ?2, ...).
+
+    Rows that hit the conflict column update the existing row, but only where
+    the file gives a value: blank cells and columns missing from the file
+    leave what is stored alone. Blank yes/no cells of new rows insert 0.
+    """
+    columns, values, updates = [], [], []
+    for position, (name, kind, _) in enumerate(spec["columns"], 1):
+        value = f"?{position}"
+        if kind in REFERENCES:
+            table, key = REFERENCES[kind]
+            name, value = f"{name}_id", f"(SELECT id FROM {table} WHERE {key} = ?{position})"
+        columns.append(name)
+        values.append(f"COALESCE({value}, 0)" if kind == "bool" else value)
+        if name != spec["conflict"]:
+            updates.append(f"{name} = COALESCE({value}, {name})")
+    sql = f"INSERT INTO {spec['table']} ({', '.join(columns)}) VALUES ({', '.join(values)})"
+    if spec["conflict"]:
+        sql += f" ON CONFLICT ({spec['conflict']}) DO UPDATE SET {', '.join(updates)}"
+    return sql
+
+
+# --- Reading ---
+
+def read_chunks(file, filename, chunk_size=CHUNK_SIZE):
+    """Yield the file as DataFrames of up to ``chunk_size`` rows, all values text.
+
+    CSV is streamed; Excel sheets are read whole (openpyxl has no chunked
+    reader) and then split.
+    """
+    options = {"dtype": str, "keep_default_na": False}
+    if filename.lower().endswith((".xlsx", ".xls")):
+        try:
+            sheet = pd.read_excel(file, **options)
+        except ImportError as e:
+            raise ValueError("Excel import needs openpyxl (pip install openpyxl); or save the sheet as CSV.") from e
+        for start in range(0, len(sheet), chunk_size):
+            yield sheet.iloc[start:start + chunk_size]
+    else:
+        yield from pd.read_csv(file, chunksize=chunk_size, **options)
+
+
+# --- Validation ---
+
+def reference_names(spec, db_path=DEFAULT_DB_PATH):
+    """Return {reference type: lower-cased names} for the spec's reference columns."""
+    names = {}
+    for _, kind, _ in spec["columns"]:
+        if kind in REFERENCES and kind not in names:
+            table, key = REFERENCES[kind]
+            with get_connection(db_path) as conn:
+                rows = conn.execute(f"SELECT {key} FROM {table}").fetchall()
+            names[kind] = {name.lower() for (name,) in rows}
+    return names
+
+
+def normalize(chunk, spec, references=None):
+    """Return (rows, errors) for one chunk.
+
+    ``references`` holds the known names of each reference type, as
+    returned by reference_names().
+
+    ``rows`` holds the valid rows as tuples in the spec's column order;
+    ``errors`` is a DataFrame of (line, column, error) for the rest.
+    """
+    chunk = chunk.rename(columns=lambda c: str(c).strip().lower().replace(" ", "_"))
+    missing = [name for name, _, required in spec["columns"] if required and name not in chunk.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+    values, problems = {}, []
+    for name, kind, required in spec["columns"]:
+        if name in chunk.columns:
+            text = chunk[name].astype("string").str.strip()
+        else:
+            text = pd.Series("", index=chunk.index, dtype="string")
+        blank = text.isna() | (text == "")
+        if required:
+            problems.append((blank, name, "is required"))
+
+        if kind in ("int", "real", "day"):
+            number = pd.to_numeric(text.where(~blank), errors="coerce")
+            problems.append((~blank & number.isna(), name, "is not a number"))
+            problems.append((number < 0, name, "must not be negative"))
+            if kind == "day":
+                problems.append((number.notna() & ~number.between(1, 31), name, "must be a day of the month (1-31)"))
+            if kind in ("int", "day"):
+                problems.append((number.notna() & (number % 1 != 0), name, "must be a whole number"))
+                number = number.round().astype("Int64")
+            values[name] = number
+        elif kind == "bool":
+            lowered = text.str.lower()
+            problems.append((~blank & ~lowered.isin(TRUE_VALUES | FALSE_VALUES), name, "must be yes/no"))
+            values[name] = lowered.isin(TRUE_VALUES).astype("Int64").where(~blank)
+        elif kind == "phone":
+            phone = text.str.replace(r"[\s\-().]", "", regex=True)
+            problems.append((~blank & ~phone.str.match(PHONE_PATTERN).fillna(False), name, "is not a phone number"))
+            values[name] = phone.where(~blank)
+        elif kind in REFERENCES:
+            known = text.str.lower().isin((references or {}).get(kind, set()))
+            problems.append((~blank & ~known, name, f"is not a known {kind}"))
+            values[name] = text.where(~blank)
+        else:
+            values[name] = text.where(~blank)
+
+    invalid = pd.Series(False, index=chunk.index)
+    errors = []
+    for mask, name, message in problems:
+        mask = mask.fillna(False).astype(bool)
+        invalid |= mask
+        if mask.any():
+            errors.append(pd.DataFrame({"line": mask.index[mask] + 2, "column": name, "error": f"{name} {message}"}))
+
+    valid = pd.DataFrame(values)[~invalid]
+    # astype(object) turns numpy/pandas scalars and missing values into plain
+    # Python values and None, which is what sqlite3 binds.
+    valid = valid.astype(object).where(valid.notna(), None)
+    rows = list(valid.itertuples(index=False, name=None))
+    errors = pd.concat(errors).sort_values("line") if errors else pd.DataFrame(columns=["line", "column", "error"])
+    return rows, errors
+
+
+# --- Import ---
+
+def import_file(kind, file, filename, db_path=DEFAULT_DB_PATH, on_progress=None):
+    """Import ``file`` as ``kind`` (a key of SPECS).
+
+    ``on_progress(rows_read, fraction)`` is called after each chunk, with
+    ``fraction`` estimated from the position in the file. Returns a dict with
+    the rows read, rows imported and a DataFrame of per-row errors.
+    """
+    spec = SPECS[kind]
+    sql = insert_sql(spec)
+    references = reference_names(spec, db_path)
+    size = _size(file)
+    read = imported = 0
+    all_errors = []
+    for chunk in read_chunks(file, filename):
+        rows, errors = normalize(chunk, spec, references)
+        if rows:
+            with transaction(db_path) as c:
+                c.executemany(sql, rows)
+        read += len(chunk)
+        imported += len(rows)
+        all_errors.append(errors)
+        if on_progress:
+            on_progress(read, min(file.tell() / size, 1.0) if size else 1.0)
+    errors = pd.concat(all_errors, ignore_index=True) if all_errors else pd.DataFrame(columns=["line", "column", "error"])
+    return {"read": read, "imported": imported, "errors": errors}
+
+
+def _size(file):
+    try:
+        return os.fstat(file.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        return getattr(file, "size", None) or len(file.getbuffer())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in SPECS:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(2)
+    kind, path = sys.argv[1], sys.argv[2]
+    db_path = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_DB_PATH
+    with open(path, "rb") as f:
+        result = import_file(kind, f, path, db_path,
+                             on_progress=lambda rows, fraction: print(f"\r{rows} rows ({fraction:.0%})", end=""))
+    print(f"\nImported {result['imported']} of {result['read']} rows.")
+    if not result["errors"].empty:
+        print(result["errors"].to_string(index=False))
+        sys.exit(1)
@@ -0,0 +1,162 @@
+"""Lucky draws, run in SQL.
+
+Eligibility and weights are computed in one SELECT over clients (see
+eligible_sql()). The eligible clients are loaded into a temporary table
+keyed on their running weight total, a cumulative-weight index, so each pick
+is one index lookup of the first running total above a random point: a
+client is picked with probability weight / total weight. The index is kept
+on the writer connection between draws and rebuilt only when the rules, or
+the columns they read (counted in lucky_draw_inputs), have changed.
+
+Several winners are drawn without replacement by re-drawing when an earlier
+winner comes up again; if that keeps happening (a few clients holding most
+of the weight), the winners are taken out and the index rebuilt. The draw,
+its rules, the random seed and the winners are recorded in lucky_draws and
+lucky_draw_winners, all in one transaction.
+"""
+import json
+import random
+import secrets
+from datetime import date, datetime, timedelta
+
+import repository
+from db import DEFAULT_DB_PATH, transaction
+
+PREMIUM_WEIGHT = 3
+WEIGHTINGS = {
+    "uniform": "1.0",
+    "recharge_volume": "COALESCE(s.recharged_amount, 0)",
+    "premium": f"CASE WHEN c.premium = 1 THEN {PREMIUM_WEIGHT} ELSE 1 END",
+}
+DEFAULT_RULES = {
+    "active_this_month": False,     # a Recharged order this calendar month
+    "premium_only": False,
+    "min_spend": 0,                 # lifetime recharged amount, ₹
+    "exclude_winners_days": 0,      # skip clients who won within this many days
+    "weighting": "uniform",
+}
+MAX_REDRAWS = 20                    # repeated picks per winner before rebuilding the index
+
+ELIGIBLE_TABLES = ["clients", "client_stats", "orders", "lucky_draw_winners"]
+POOL = """
+    SELECT SUM(weight) OVER (ORDER BY client_id ROWS UNBOUNDED PRECEDING), client_id, weight
+    FROM ({eligible}) WHERE weight > 0 AND client_id NOT IN (SELECT value FROM json_each(?))
+"""
+BUILD_POOL = "INSERT INTO temp.draw_pool (upper, client_id, weight)" + POOL
+PICK = "SELECT client_id, weight FROM temp.draw_pool WHERE upper > ? ORDER BY upper LIMIT 1"
+INPUT_VERSIONS = "SELECT name, version FROM lucky_draw_inputs"
+
+# {db_path: (key, eligible clients, total weight)} of the pool in temp.draw_pool.
+_pools = {}
+
+
+def eligible_sql(rules, today=None):
+    """Return (sql, params) selecting client_id and weight of every eligible client."""
+    rules = {**DEFAULT_RULES, **rules}
+    today = today or date.today()
+    where, params = [], []
+    if rules["active_this_month"]:
+        month_start = today.replace(day=1)
+        next_month_start = (month_start + timedelta(days=32)).replace(day=1)
+        # One range read of this month's orders on orders(status, created_at),
+        # rather than probing every client's history.
+        where.append("""c.id IN (
+            SELECT client_id FROM orders WHERE status = 'Recharged' AND created_at >= ? AND created_at < ?
+        )""")
+        params += [month_start.strftime("%Y-%m-%d"), next_month_start.strftime("%Y-%m-%d")]
+    if rules["premium_only"]:
+        where.append("c.premium = 1")
+    if rules["min_spend"]:
+        where.append("COALESCE(s.recharged_amount, 0) >= ?")
+        params.append(rules["min_spend"])
+    if rules["exclude_winners_days"]:
+        where.append("""NOT EXISTS (
+            SELECT 1 FROM lucky_draw_winners AS w WHERE w.client_id = c.id AND w.drawn_at >= ?
+        )""")
+        params.append((today - timedelta(days=rules["exclude_winners_days"])).strftime("%Y-%m-%d"))
+    sql = (f"SELECT c.id AS client_id, {WEIGHTINGS[rules['weighting']]} AS weight "
+           "FROM clients AS c LEFT JOIN client_stats AS s ON s.client_id = c.id")
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql, params
+
+
+def eligible_summary(rules, today=None):
+    """Return (eligible clients, total weight) under ``rules``, without reading the clients."""
+    sql, params = eligible_sql(rules, today)
+    summary = repository.read_df(
+        f"SELECT COUNT(*) AS clients, COALESCE(SUM(weight), 0) AS total_weight FROM ({sql}) WHERE weight > 0",
+        ELIGIBLE_TABLES, params
+    ).iloc[0]
+    return int(summary["clients"]), float(summary["total_weight"])
+
+
+def _inputs(rules):
+    """Return the lucky_draw_inputs a draw under ``rules`` depends on."""
+    inputs = ["clients"]
+    if rules["weighting"] == "recharge_volume" or rules["min_spend"]:
+        inputs.append("client_stats")
+    if rules["active_this_month"]:
+        inputs.append("orders")
+    if rules["exclude_winners_days"]:
+        inputs.append("lucky_draw_winners")
+    return inputs
+
+
+def _build_pool(c, eligible, params, exclude):
+    c.execute("CREATE TEMP TABLE IF NOT EXISTS draw_pool (upper REAL PRIMARY KEY, client_id INTEGER, weight REAL) "
+              "WITHOUT ROWID")
+    c.execute("DELETE FROM temp.draw_pool")
+    c.execute(BUILD_POOL.format(eligible=eligible), list(params) + [json.dumps(sorted(exclude))])
+    count, total = c.execute("SELECT COUNT(*), MAX(upper) FROM temp.draw_pool").fetchone()
+    return count, total or 0.0
+
+
+def draw(winners=1, rules=None, today=None, db_path=DEFAULT_DB_PATH, seed=None):
+    """Draw up to ``winners`` distinct clients under ``rules`` and record the draw.
+
+    Returns (draw id, winners as a list of (client_id, weight)); the id is
+    None and nothing is recorded if nobody is eligible.
+    """
+    rules = {**DEFAULT_RULES, **(rules or {})}
+    seed = secrets.randbits(63) if seed is None else seed
+    rng = random.Random(seed)
+    eligible, params = eligible_sql(rules, today)
+    drawn_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with transaction(db_path) as c:
+        # Taken out while the draw runs: a rollback also rolls back the pool.
+        pool = _pools.pop(db_path, None)
+        versions = dict(c.execute(INPUT_VERSIONS))
+        key = (eligible, tuple(params), tuple(versions[name] for name in _inputs(rules)))
+        if pool is not None and pool[0] == key:
+            _, eligible_count, total_weight = pool
+        else:
+            eligible_count, total_weight = _build_pool(c, eligible, params, ())
+        total = total_weight
+        picked, seen, redraws, whole_pool = [], set(), 0, True
+        while len(picked) < min(winners, eligible_count):
+            if redraws > MAX_REDRAWS:
+                _, total = _build_pool(c, eligible, params, seen)
+                redraws, whole_pool = 0, False
+            client_id, weight = c.execute(PICK, (rng.random() * total,)).fetchone()
+            if client_id in seen:
+                redraws += 1
+                continue
+            seen.add(client_id)
+            picked.append((client_id, weight))
+            redraws = 0
+        if not picked:
+            return None, []
+
+        c.execute("INSERT INTO lucky_draws (drawn_at, rules, eligible, total_weight, seed) VALUES (?, ?, ?, ?, ?)",
+                  (drawn_at, json.dumps(rules), eligible_count, total_weight, seed))
+        draw_id = c.lastrowid
+        c.executemany(
+            "INSERT INTO lucky_draw_winners (draw_id, position, client_id, weight, drawn_at) VALUES (?, ?, ?, ?, ?)",
+            [(draw_id, position, client_id, weight, drawn_at) for position, (client_id, weight) in enumerate(picked, 1)]
+        )
+        c.executemany("UPDATE clients SET lucky_draw_wins = lucky_draw_wins + 1 WHERE id = ?",
+                      [(client_id,) for client_id, _ in picked])
+    if whole_pool:
+        _pools[db_path] = (key, eligible_count, total_weight)
+    return draw_id, picked
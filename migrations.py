@@ -0,0 +1,777 @@
+import os
+import re
+
+from settings import CONFIG_PATH, DEFAULT_COMMISSION_RATE, commission_rate, load_config
+
+# --- Versioned schema migrations ---
+# Each migration runs exactly once per database file. The applied version is
+# stored in SQLite's built-in PRAGMA user_version, so checking for pending work
+# is a single header read and a steady-state rerun executes no DDL at all.
+# Append new migrations to MIGRATIONS with the next version number; never edit
+# or reorder ones that have already shipped.
+
+
+def _create_base_tables(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS clients (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        phone TEXT UNIQUE,
+        group_name TEXT,
+        operator TEXT,
+        plan_amount REAL,
+        recharge_day INTEGER,
+        premium BOOLEAN DEFAULT 0,
+        notes TEXT,
+        lucky_draw_wins INTEGER DEFAULT 0,
+        referred BOOLEAN DEFAULT 0,
+        referred_by_name TEXT,
+        referred_by_phone TEXT
+    )''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS recharge_plans (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        data TEXT,
+        voice TEXT,
+        sms TEXT,
+        validity INTEGER,
+        operator TEXT,
+        price REAL,
+        description TEXT
+    )''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        category TEXT,
+        subcategory TEXT,
+        price REAL,
+        stock INTEGER,
+        image_paths TEXT,
+        description TEXT
+    )''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS orders (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        client_id INTEGER,
+        amount REAL,
+        discount REAL,
+        commission REAL,
+        status TEXT,
+        created_at TEXT
+    )''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS product_orders (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        client_id INTEGER,
+        product_id INTEGER,
+        quantity INTEGER,
+        amount REAL,
+        status TEXT,
+        created_at TEXT
+    )''')
+
+
+def _rebuild_recharge_plans(c):
+    # Formerly ran at the bottom of app.py on every rerun.
+    c.execute("""
+        CREATE TABLE recharge_plans_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            data TEXT,
+            voice TEXT,
+            sms TEXT,
+            validity INTEGER,
+            operator TEXT,
+            price REAL,
+            description TEXT
+        )
+    """)
+    c.execute("""
+        INSERT INTO recharge_plans_new (id, name, data, voice, sms, validity, operator, price, description)
+        SELECT id, name, data, voice, sms, validity, operator, price, description FROM recharge_plans
+    """)
+    c.execute("DROP TABLE recharge_plans")
+    c.execute("ALTER TABLE recharge_plans_new RENAME TO recharge_plans")
+
+
+# Secondary indexes backing the app's hot filters and sort orders. Every query
+# the app issues should be covered by one of these; query_audit.py checks that.
+INDEXES = [
+    ("idx_orders_status_created_at", "orders", "status, created_at"),
+    ("idx_orders_client_id_created_at", "orders", "client_id, created_at"),
+    ("idx_orders_created_at", "orders", "created_at"),
+    ("idx_product_orders_status_created_at", "product_orders", "status, created_at"),
+    ("idx_product_orders_client_id_created_at", "product_orders", "client_id, created_at"),
+    ("idx_product_orders_created_at", "product_orders", "created_at"),
+    ("idx_clients_recharge_day", "clients", "recharge_day"),
+    ("idx_recharge_plans_operator_price", "recharge_plans", "operator, price"),
+]
+
+
+# Sort keys of the paginated client and product listings.
+LISTING_INDEXES = [
+    ("idx_clients_name", "clients", "name"),
+    ("idx_products_name", "products", "name"),
+]
+
+# Product catalogue filters: category / subcategory drop-downs and pages
+# within a category, and price-ordered or price-bounded pages.
+CATALOGUE_INDEXES = [
+    ("idx_products_category_subcategory_name", "products", "category, subcategory, name"),
+    ("idx_products_price", "products", "price"),
+]
+
+
+def _create_indexes(c, indexes=INDEXES):
+    for name, table, columns in indexes:
+        c.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+
+
+def _create_client_search_index(c):
+    # External-content FTS5 index over clients, kept in sync by triggers. The
+    # trigram tokenizer matches any substring of 3+ characters, like the old
+    # LIKE '%term%' search but without scanning the table.
+    c.execute("""
+        CREATE VIRTUAL TABLE clients_fts USING fts5(
+            name, phone, notes, group_name,
+            content='clients', content_rowid='id', tokenize='trigram'
+        )
+    """)
+    c.execute("""
+        CREATE TRIGGER clients_fts_ai AFTER INSERT ON clients BEGIN
+            INSERT INTO clients_fts(rowid, name, phone, notes, group_name)
+            VALUES (new.id, new.name, new.phone, new.notes, new.group_name);
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER clients_fts_ad AFTER DELETE ON clients BEGIN
+            INSERT INTO clients_fts(clients_fts, rowid, name, phone, notes, group_name)
+            VALUES ('delete', old.id, old.name, old.phone, old.notes, old.group_name);
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER clients_fts_au AFTER UPDATE OF name, phone, notes, group_name ON clients BEGIN
+            INSERT INTO clients_fts(clients_fts, rowid, name, phone, notes, group_name)
+            VALUES ('delete', old.id, old.name, old.phone, old.notes, old.group_name);
+            INSERT INTO clients_fts(rowid, name, phone, notes, group_name)
+            VALUES (new.id, new.name, new.phone, new.notes, new.group_name);
+        END
+    """)
+    c.execute("INSERT INTO clients_fts(clients_fts) VALUES ('rebuild')")
+
+
+def _create_client_stats(c):
+    # Per-client order counters, maintained by triggers on every order write so
+    # listings read one row per client instead of counting orders.
+    c.execute("""
+        CREATE TABLE client_stats (
+            client_id INTEGER PRIMARY KEY,
+            recharge_orders INTEGER NOT NULL DEFAULT 0,
+            product_orders INTEGER NOT NULL DEFAULT 0,
+            recharged_amount REAL NOT NULL DEFAULT 0,
+            last_recharge_at TEXT,
+            total_commission REAL NOT NULL DEFAULT 0
+        )
+    """)
+
+    # Recharge aggregates cover 'Recharged' orders only. last_recharge_at
+    # cannot be decremented, so removals re-read it through
+    # orders(client_id, created_at).
+    add_order = """
+        INSERT OR IGNORE INTO client_stats (client_id) SELECT new.client_id WHERE new.client_id IS NOT NULL;
+        UPDATE client_stats SET
+            recharge_orders = recharge_orders + 1,
+            recharged_amount = recharged_amount + CASE WHEN new.status = 'Recharged' THEN COALESCE(new.amount, 0) ELSE 0 END,
+            total_commission = total_commission + CASE WHEN new.status = 'Recharged' THEN COALESCE(new.commission, 0) ELSE 0 END,
+            last_recharge_at = CASE
+                WHEN new.status = 'Recharged' AND (last_recharge_at IS NULL OR new.created_at > last_recharge_at)
+                THEN new.created_at ELSE last_recharge_at END
+        WHERE client_id = new.client_id;
+    """
+    remove_order = """
+        UPDATE client_stats SET
+            recharge_orders = recharge_orders - 1,
+            recharged_amount = recharged_amount - CASE WHEN old.status = 'Recharged' THEN COALESCE(old.amount, 0) ELSE 0 END,
+            total_commission = total_commission - CASE WHEN old.status = 'Recharged' THEN COALESCE(old.commission, 0) ELSE 0 END,
+            last_recharge_at = CASE WHEN old.status = 'Recharged' THEN (
+                SELECT MAX(created_at) FROM orders WHERE client_id = old.client_id AND status = 'Recharged'
+            ) ELSE last_recharge_at END
+        WHERE client_id = old.client_id;
+    """
+    c.execute(f"CREATE TRIGGER client_stats_orders_ai AFTER INSERT ON orders BEGIN {add_order} END")
+    c.execute(f"CREATE TRIGGER client_stats_orders_ad AFTER DELETE ON orders BEGIN {remove_order} END")
+    c.execute(f"""
+        CREATE TRIGGER client_stats_orders_au
+        AFTER UPDATE OF client_id, amount, commission, status, created_at ON orders
+        BEGIN {remove_order} {add_order} END
+    """)
+
+    c.execute("""
+        CREATE TRIGGER client_stats_product_orders_ai AFTER INSERT ON product_orders BEGIN
+            INSERT OR IGNORE INTO client_stats (client_id) SELECT new.client_id WHERE new.client_id IS NOT NULL;
+            UPDATE client_stats SET product_orders = product_orders + 1 WHERE client_id = new.client_id;
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER client_stats_product_orders_ad AFTER DELETE ON product_orders BEGIN
+            UPDATE client_stats SET product_orders = product_orders - 1 WHERE client_id = old.client_id;
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER client_stats_product_orders_au AFTER UPDATE OF client_id ON product_orders BEGIN
+            UPDATE client_stats SET product_orders = product_orders - 1 WHERE client_id = old.client_id;
+            INSERT OR IGNORE INTO client_stats (client_id) SELECT new.client_id WHERE new.client_id IS NOT NULL;
+            UPDATE client_stats SET product_orders = product_orders + 1 WHERE client_id = new.client_id;
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER client_stats_clients_ad AFTER DELETE ON clients BEGIN
+            DELETE FROM client_stats WHERE client_id = old.id;
+        END
+    """)
+
+    rebuild_client_stats(c)
+
+
+def rebuild_client_stats(c, orders="orders", product_orders="product_orders"):
+    """Recompute client_stats from orders and product_orders.
+
+    ``orders`` and ``product_orders`` may name other sources with the same
+    columns, e.g. a UNION ALL that includes archived orders.
+    """
+    c.execute("DELETE FROM client_stats")
+    c.execute(f"""
+        INSERT INTO client_stats (client_id, recharge_orders, recharged_amount, last_recharge_at, total_commission)
+        SELECT client_id,
+               COUNT(*),
+               COALESCE(SUM(CASE WHEN status = 'Recharged' THEN amount END), 0),
+               MAX(CASE WHEN status = 'Recharged' THEN created_at END),
+               COALESCE(SUM(CASE WHEN status = 'Recharged' THEN commission END), 0)
+        FROM {orders} WHERE client_id IS NOT NULL GROUP BY client_id
+    """)
+    c.execute(f"""
+        INSERT INTO client_stats (client_id, product_orders)
+        SELECT client_id, COUNT(*) FROM {product_orders} AS p WHERE client_id IS NOT NULL GROUP BY client_id
+        ON CONFLICT (client_id) DO UPDATE SET product_orders = excluded.product_orders
+    """)
+
+
+def _create_daily_recharge_stats(c):
+    # Per-day, per-status recharge totals, maintained by triggers on orders so
+    # the dashboard sums a few hundred rollup rows instead of every order.
+    # Commission follows the dashboard's rule: 5% of the amount less the
+    # discount, never negative.
+    c.execute("""
+        CREATE TABLE daily_recharge_stats (
+            day TEXT NOT NULL,
+            status TEXT NOT NULL,
+            orders INTEGER NOT NULL DEFAULT 0,
+            gross_amount REAL NOT NULL DEFAULT 0,
+            discount REAL NOT NULL DEFAULT 0,
+            commission REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, status)
+        ) WITHOUT ROWID
+    """)
+    _create_daily_recharge_stats_triggers(
+        c, "MAX(COALESCE({row}.amount, 0) * 0.05 - COALESCE({row}.discount, 0), 0)", "amount, discount, status, created_at"
+    )
+    rebuild_daily_recharge_stats(c)
+
+
+def _create_daily_recharge_stats_triggers(c, commission, columns):
+    # ``commission`` is the SQL for one order's commission, with {row} standing
+    # for new/old; the update trigger fires on changes to ``columns``.
+    def apply(row, sign):
+        key = f"COALESCE(substr({row}.created_at, 1, 10), ''), COALESCE({row}.status, '')"
+        return f"""
+            INSERT OR IGNORE INTO daily_recharge_stats (day, status) VALUES ({key});
+            UPDATE daily_recharge_stats SET
+                orders = orders {sign} 1,
+                gross_amount = gross_amount {sign} COALESCE({row}.amount, 0),
+                discount = discount {sign} COALESCE({row}.discount, 0),
+                commission = commission {sign} {commission.format(row=row)}
+            WHERE (day, status) = ({key});
+        """
+
+    c.execute(f"CREATE TRIGGER daily_recharge_stats_ai AFTER INSERT ON orders BEGIN {apply('new', '+')} END")
+    c.execute(f"CREATE TRIGGER daily_recharge_stats_ad AFTER DELETE ON orders BEGIN {apply('old', '-')} END")
+    c.execute(f"""
+        CREATE TRIGGER daily_recharge_stats_au AFTER UPDATE OF {columns} ON orders
+        BEGIN {apply('old', '-')} {apply('new', '+')} END
+    """)
+
+
+def rebuild_daily_recharge_stats(c, orders="orders"):
+    """Recompute daily_recharge_stats from orders (or another source, as above)."""
+    c.execute("DELETE FROM daily_recharge_stats")
+    c.execute(f"""
+        INSERT INTO daily_recharge_stats (day, status, orders, gross_amount, discount, commission)
+        SELECT COALESCE(substr(created_at, 1, 10), ''), COALESCE(status, ''),
+               COUNT(*),
+               COALESCE(SUM(amount), 0),
+               COALESCE(SUM(discount), 0),
+               COALESCE(SUM(commission), 0)
+        FROM {orders}
+        GROUP BY 1, 2
+    """)
+
+
+def _backfill_commission_rate(c):
+    # The config.json beside the database, not the working directory's; a
+    # missing or unreadable file means the default rate rather than a failed
+    # migration.
+    db_file = c.execute("PRAGMA database_list").fetchone()[2]
+    path = os.path.join(os.path.dirname(db_file), CONFIG_PATH)
+    try:
+        return commission_rate(load_config(path))
+    except (OSError, ValueError, AttributeError):
+        return DEFAULT_COMMISSION_RATE
+
+
+def _store_commission(c):
+    # Commission is now computed once on the write path (orders.py) at the
+    # rate in config.json. Backfill it for existing orders, which were written
+    # with 0.0, and have the daily rollup sum the stored column.
+    for trigger in ("daily_recharge_stats_ai", "daily_recharge_stats_ad", "daily_recharge_stats_au"):
+        c.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    c.execute(
+        "UPDATE orders SET commission = MAX(COALESCE(amount, 0) * ? - COALESCE(discount, 0), 0)",
+        (_backfill_commission_rate(c),)
+    )
+    _create_daily_recharge_stats_triggers(
+        c, "COALESCE({row}.commission, 0)", "amount, discount, commission, status, created_at"
+    )
+    rebuild_daily_recharge_stats(c)
+
+
+def _create_product_images(c):
+    # One row per product image, replacing the JSON list in
+    # products.image_paths. Metadata of images that predate this table is
+    # filled in by `python images.py backfill`.
+    c.execute("""
+        CREATE TABLE product_images (
+            product_id INTEGER NOT NULL,
+            sort_order INTEGER NOT NULL,
+            path TEXT NOT NULL,
+            hash TEXT,
+            width INTEGER,
+            height INTEGER,
+            thumbnail_small TEXT,
+            thumbnail_large TEXT,
+            PRIMARY KEY (product_id, sort_order)
+        ) WITHOUT ROWID
+    """)
+    c.execute("CREATE INDEX idx_product_images_hash ON product_images (hash)")
+    c.execute("CREATE INDEX idx_product_images_path ON product_images (path)")
+    c.execute("""
+        CREATE TRIGGER product_images_products_ad AFTER DELETE ON products BEGIN
+            DELETE FROM product_images WHERE product_id = old.id;
+        END
+    """)
+    c.execute("""
+        INSERT INTO product_images (product_id, sort_order, path)
+        SELECT p.id, j.key, j.value
+        FROM products AS p, json_each(p.image_paths) AS j
+        WHERE json_valid(p.image_paths) AND json_type(p.image_paths) = 'array' AND j.type = 'text'
+    """)
+    c.execute("ALTER TABLE products DROP COLUMN image_paths")
+
+
+# Delete triggers that keep the rollups current. Archiving moves orders out of
+# the hot tables without un-counting them, so these skip while it runs.
+ROLLUP_DELETE_TRIGGERS = ["client_stats_orders_ad", "client_stats_product_orders_ad", "daily_recharge_stats_ad"]
+
+
+def _guard_rollup_delete_triggers(c):
+    # archive_state.active is only ever 1 inside an archiving transaction, so
+    # no other connection sees it set.
+    c.execute("CREATE TABLE archive_state (active INTEGER NOT NULL DEFAULT 0)")
+    c.execute("INSERT INTO archive_state (active) VALUES (0)")
+    for name in ROLLUP_DELETE_TRIGGERS:
+        (sql,) = c.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,)).fetchone()
+        c.execute(f"DROP TRIGGER {name}")
+        c.execute(re.sub(r"\bBEGIN\b", "WHEN NOT (SELECT active FROM archive_state) BEGIN", sql, count=1, flags=re.I))
+
+
+# The worker claims due deliveries in next_attempt_at order; the WhatsApp
+# pages list the latest campaigns of a kind and count their deliveries by
+# status; fan-out selects clients by group.
+OUTBOX_INDEXES = [
+    ("idx_outbox_kind", "outbox", "kind"),
+    ("idx_deliveries_status_next_attempt_at", "deliveries", "status, next_attempt_at"),
+    ("idx_deliveries_outbox_id_status", "deliveries", "outbox_id, status"),
+    ("idx_clients_group_name", "clients", "group_name"),
+]
+
+
+def _create_outbox(c):
+    # WhatsApp messages waiting to be sent. outbox holds one row per ad or
+    # alert; deliveries one row per recipient, claimed and updated by the
+    # worker in outbox.py. The phone is copied so a delivery still goes out
+    # if the client is edited or deleted after queuing.
+    c.execute("""
+        CREATE TABLE outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            title TEXT,
+            message TEXT NOT NULL,
+            target_group TEXT NOT NULL,
+            recipients INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL
+        )
+    """)
+    c.execute("""
+        CREATE TABLE deliveries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            outbox_id INTEGER NOT NULL,
+            client_id INTEGER,
+            phone TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'Queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TEXT NOT NULL,
+            gateway TEXT,
+            provider_id TEXT,
+            last_error TEXT,
+            sent_at TEXT
+        )
+    """)
+    _create_indexes(c, OUTBOX_INDEXES)
+    c.execute("""
+        CREATE TRIGGER deliveries_outbox_ad AFTER DELETE ON outbox BEGIN
+            DELETE FROM deliveries WHERE outbox_id = old.id;
+        END
+    """)
+
+
+def due_date_sql(today, day):
+    """Return an SQL expression for the first date on or after ``today`` that
+    falls on day-of-month ``day``, or on the month's last day when the month
+    is shorter (a 31st client is due on 30 April and 28/29 February)."""
+    month = f"date({today}, 'start of month')"
+
+    def in_month(month_start):
+        last_day = f"CAST(strftime('%d', {month_start}, '+1 month', '-1 day') AS INTEGER)"
+        return f"date({month_start}, '+' || (MIN({day}, {last_day}) - 1) || ' days')"
+
+    this_month, next_month = in_month(month), in_month(f"date({month}, '+1 month')")
+    return f"CASE WHEN {this_month} >= {today} THEN {this_month} ELSE {next_month} END"
+
+
+def _create_due_calendar(c):
+    # Each client's next recharge due date, so "due today / this week" is a
+    # range read on due_date instead of a recharge_day lookup. Triggers place
+    # new and edited clients; scheduler.py moves passed dates to the next
+    # month every day and records which due date a reminder went out for.
+    c.execute("""
+        CREATE TABLE due_calendar (
+            client_id INTEGER PRIMARY KEY,
+            due_date TEXT NOT NULL,
+            reminded_for TEXT
+        )
+    """)
+    c.execute("CREATE INDEX idx_due_calendar_due_date ON due_calendar (due_date)")
+    today = "date('now', 'localtime')"
+    c.execute(f"""
+        CREATE TRIGGER due_calendar_clients_ai AFTER INSERT ON clients
+        WHEN new.recharge_day BETWEEN 1 AND 31 BEGIN
+            INSERT INTO due_calendar (client_id, due_date) VALUES (new.id, {due_date_sql(today, "new.recharge_day")});
+        END
+    """)
+    c.execute(f"""
+        CREATE TRIGGER due_calendar_clients_au AFTER UPDATE OF recharge_day ON clients BEGIN
+            DELETE FROM due_calendar WHERE client_id = old.id;
+            INSERT INTO due_calendar (client_id, due_date)
+            SELECT new.id, {due_date_sql(today, "new.recharge_day")} WHERE new.recharge_day BETWEEN 1 AND 31;
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER due_calendar_clients_ad AFTER DELETE ON clients BEGIN
+            DELETE FROM due_calendar WHERE client_id = old.id;
+        END
+    """)
+    c.execute(f"""
+        INSERT INTO due_calendar (client_id, due_date)
+        SELECT id, {due_date_sql(today, "recharge_day")} FROM clients WHERE recharge_day BETWEEN 1 AND 31
+    """)
+
+
+def _create_lucky_draws(c):
+    # History of lucky draws: the rules each was drawn under, and its
+    # winners. Winners carry drawn_at so "no recent winners" is a lookup on
+    # (client_id, drawn_at).
+    c.execute("""
+        CREATE TABLE lucky_draws (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            drawn_at TEXT NOT NULL,
+            rules TEXT NOT NULL,
+            eligible INTEGER NOT NULL,
+            total_weight REAL NOT NULL,
+            seed INTEGER NOT NULL
+        )
+    """)
+    c.execute("""
+        CREATE TABLE lucky_draw_winners (
+            draw_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            client_id INTEGER NOT NULL,
+            weight REAL NOT NULL,
+            drawn_at TEXT NOT NULL,
+            PRIMARY KEY (draw_id, position)
+        ) WITHOUT ROWID
+    """)
+    c.execute("CREATE INDEX idx_lucky_draw_winners_client_id_drawn_at ON lucky_draw_winners (client_id, drawn_at)")
+
+
+def _create_inventory_ledger(c):
+    # Every change to products.stock, written in the same transaction as the
+    # change: a trigger opens each new product's ledger with its initial
+    # stock, and orders.py records orders taking stock, cancellations and
+    # deletions giving it back, and edits on the Product Catalogue page.
+    c.execute("""
+        CREATE TABLE inventory_ledger (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL,
+            change INTEGER NOT NULL,
+            stock_after INTEGER NOT NULL,
+            reason TEXT NOT NULL,
+            product_order_id INTEGER,
+            created_at TEXT NOT NULL
+        )
+    """)
+    # A product's movements, and the stock an order holds (its movements' sum).
+    c.execute("CREATE INDEX idx_inventory_ledger_product_id ON inventory_ledger (product_id)")
+    c.execute("CREATE INDEX idx_inventory_ledger_product_order_id ON inventory_ledger (product_order_id)")
+    opening = "'opening', datetime('now', 'localtime')"
+    c.execute(f"""
+        CREATE TRIGGER inventory_ledger_products_ai AFTER INSERT ON products BEGIN
+            INSERT INTO inventory_ledger (product_id, change, stock_after, reason, created_at)
+            VALUES (new.id, COALESCE(new.stock, 0), COALESCE(new.stock, 0), {opening});
+        END
+    """)
+    c.execute(f"""
+        INSERT INTO inventory_ledger (product_id, change, stock_after, reason, created_at)
+        SELECT id, COALESCE(stock, 0), COALESCE(stock, 0), {opening} FROM products
+    """)
+
+
+DEFAULT_OPERATORS = ["Airtel", "Jio", "Vi", "BSNL"]
+OPERATOR_INDEXES = [
+    ("idx_clients_operator_id", "clients", "operator_id"),
+    ("idx_recharge_plans_operator_id_price", "recharge_plans", "operator_id, price"),
+]
+
+
+def _create_operators(c):
+    # Mobile operators as a reference table. clients and recharge_plans held
+    # the operator's name as free text, and older databases also carry an
+    # ad-hoc operators table with every operator repeated; both now hold
+    # operator_id. Every name in use is kept, whatever its case or spacing.
+    legacy = c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'operators'").fetchone()
+    if legacy:
+        c.execute("ALTER TABLE operators RENAME TO operators_legacy")
+    c.execute("""
+        CREATE TABLE operators (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+            image_path TEXT
+        )
+    """)
+    c.executemany("INSERT INTO operators (name) VALUES (?)", [(name,) for name in DEFAULT_OPERATORS])
+    sources = [("clients", "operator"), ("recharge_plans", "operator")]
+    if legacy:
+        sources.insert(0, ("operators_legacy", "name"))
+    for table, column in sources:
+        c.execute(f"""
+            INSERT OR IGNORE INTO operators (name)
+            SELECT TRIM({column}) FROM {table} WHERE TRIM({column}) != '' GROUP BY TRIM({column}) ORDER BY MIN(rowid)
+        """)
+    if legacy:
+        c.execute("""
+            UPDATE operators SET image_path = (
+                SELECT l.image_path FROM operators_legacy AS l WHERE TRIM(l.name) = operators.name ORDER BY l.id LIMIT 1
+            )
+        """)
+        c.execute("DROP TABLE operators_legacy")
+
+    c.execute("DROP INDEX IF EXISTS idx_recharge_plans_operator_price")
+    for table in ("clients", "recharge_plans"):
+        c.execute(f"ALTER TABLE {table} ADD COLUMN operator_id INTEGER")
+        c.execute(f"UPDATE {table} SET operator_id = (SELECT id FROM operators WHERE name = TRIM({table}.operator))")
+        c.execute(f"ALTER TABLE {table} DROP COLUMN operator")
+    _create_indexes(c, OPERATOR_INDEXES)
+
+
+def _create_product_order_lines(c):
+    # Product orders become a header (product_orders: client, total, status,
+    # dates) with one product_order_lines row per product, priced when it was
+    # ordered. Each single-product order becomes a header with one line.
+    # Older databases also carry an unused product_order table of lines keyed
+    # on the recharge order they were bought with; those become orders of
+    # their own. Views keep both old shapes readable.
+    c.execute("""
+        CREATE TABLE product_order_lines (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            price REAL
+        )
+    """)
+    c.execute("CREATE INDEX idx_product_order_lines_order_id ON product_order_lines (order_id)")
+    c.execute("CREATE INDEX idx_product_order_lines_product_id ON product_order_lines (product_id)")
+    c.execute("""
+        INSERT INTO product_order_lines (order_id, product_id, quantity, price)
+        SELECT o.id, o.product_id, COALESCE(o.quantity, 1),
+               COALESCE(o.amount / NULLIF(o.quantity, 0), (SELECT p.price FROM products AS p WHERE p.id = o.product_id))
+        FROM product_orders AS o WHERE o.product_id IS NOT NULL ORDER BY o.id
+    """)
+    c.execute("""
+        UPDATE product_orders
+        SET amount = (SELECT SUM(l.price * l.quantity) FROM product_order_lines AS l WHERE l.order_id = product_orders.id)
+        WHERE amount IS NULL
+    """)
+    c.execute("ALTER TABLE product_orders DROP COLUMN product_id")
+    c.execute("ALTER TABLE product_orders DROP COLUMN quantity")
+
+    if c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'product_order'").fetchone():
+        legacy_orders = [order_id for (order_id,) in c.execute(
+            "SELECT order_id FROM product_order GROUP BY order_id ORDER BY MIN(id)"
+        ).fetchall()]
+        for legacy_order_id in legacy_orders:
+            c.execute("""
+                INSERT INTO product_orders (client_id, amount, status, created_at)
+                SELECT o.client_id,
+                       (SELECT SUM(l.price * l.quantity) FROM product_order AS l WHERE l.order_id IS :order_id),
+                       CASE o.status WHEN 'Recharged' THEN 'Completed' WHEN 'Failed' THEN 'Cancelled' ELSE 'Pending' END,
+                       COALESCE(o.created_at, datetime('now', 'localtime'))
+                FROM (SELECT 1) LEFT JOIN orders AS o ON o.id = :order_id
+            """, {"order_id": legacy_order_id})
+            c.execute("""
+                INSERT INTO product_order_lines (order_id, product_id, quantity, price)
+                SELECT ?, product_id, COALESCE(quantity, 1), price FROM product_order
+                WHERE order_id IS ? AND product_id IS NOT NULL ORDER BY id
+            """, (c.lastrowid, legacy_order_id))
+        c.execute("DROP TABLE product_order")
+
+    c.execute("""
+        CREATE VIEW product_order AS
+        SELECT id, product_id, order_id, quantity, price FROM product_order_lines
+    """)
+    # One row per line in the old single-product product_orders shape.
+    c.execute("""
+        CREATE VIEW product_order_details AS
+        SELECT o.id, o.client_id, l.product_id, l.quantity, l.price * l.quantity AS amount, o.status, o.created_at
+        FROM product_orders AS o JOIN product_order_lines AS l ON l.order_id = o.id
+    """)
+
+
+def _add_delivery_claimed_at(c):
+    # When a worker claimed a Sending delivery, so a starting worker requeues
+    # only claims old enough to be abandoned rather than another worker's
+    # batch in flight. Claims made before this column existed stay NULL and
+    # count as abandoned.
+    c.execute("ALTER TABLE deliveries ADD COLUMN claimed_at TEXT")
+
+
+def _keep_reminders_on_client_edits(c):
+    # UPDATE OF recharge_day fires whenever the SET list names the column,
+    # and the client form and importer always do; re-placing an unchanged
+    # due date cleared reminded_for and sent the reminder again.
+    today = "date('now', 'localtime')"
+    c.execute("DROP TRIGGER due_calendar_clients_au")
+    c.execute(f"""
+        CREATE TRIGGER due_calendar_clients_au AFTER UPDATE OF recharge_day ON clients
+        WHEN new.recharge_day IS NOT old.recharge_day BEGIN
+            DELETE FROM due_calendar WHERE client_id = old.id;
+            INSERT INTO due_calendar (client_id, due_date)
+            SELECT new.id, {due_date_sql(today, "new.recharge_day")} WHERE new.recharge_day BETWEEN 1 AND 31;
+        END
+    """)
+
+
+# The columns lucky draw eligibility and weights read, per input table.
+# lucky_draw_inputs counts changes to each, so lucky_draw.py can tell whether
+# the cumulative-weight pool it keeps is still current.
+LUCKY_DRAW_INPUTS = {
+    "clients": ["premium"],
+    "client_stats": ["recharged_amount"],
+    "orders": ["client_id", "status", "created_at"],
+    "lucky_draw_winners": ["client_id", "drawn_at"],
+}
+
+
+def _create_lucky_draw_inputs(c):
+    c.execute("""
+        CREATE TABLE lucky_draw_inputs (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    for table, columns in LUCKY_DRAW_INPUTS.items():
+        c.execute("INSERT INTO lucky_draw_inputs (name) VALUES (?)", (table,))
+        bump = f"UPDATE lucky_draw_inputs SET version = version + 1 WHERE name = '{table}';"
+        c.execute(f"CREATE TRIGGER lucky_draw_inputs_{table}_ai AFTER INSERT ON {table} BEGIN {bump} END")
+        c.execute(f"CREATE TRIGGER lucky_draw_inputs_{table}_ad AFTER DELETE ON {table} BEGIN {bump} END")
+        # Only real changes: the client form and importer set premium on every save.
+        changed = " OR ".join(f"new.{col} IS NOT old.{col}" for col in columns)
+        c.execute(f"""
+            CREATE TRIGGER lucky_draw_inputs_{table}_au AFTER UPDATE OF {', '.join(columns)} ON {table}
+            WHEN {changed} BEGIN {bump} END
+        """)
+
+
+MIGRATIONS = [
+    (1, "create base tables", _create_base_tables),
+    (2, "rebuild recharge_plans with AUTOINCREMENT ids", _rebuild_recharge_plans),
+    (3, "create hot-query indexes", _create_indexes),
+    (4, "create listing sort indexes", lambda c: _create_indexes(c, LISTING_INDEXES)),
+    (5, "create clients_fts trigram search index", _create_client_search_index),
+    (6, "create trigger-maintained client_stats", _create_client_stats),
+    (7, "create trigger-maintained daily_recharge_stats", _create_daily_recharge_stats),
+    (8, "store commission on orders and sum it in the rollups", _store_commission),
+    (9, "create product catalogue filter indexes", lambda c: _create_indexes(c, CATALOGUE_INDEXES)),
+    (10, "move products.image_paths into product_images", _create_product_images),
+    (11, "skip rollup delete triggers while archiving", _guard_rollup_delete_triggers),
+    (12, "create the WhatsApp outbox and deliveries tables", _create_outbox),
+    (13, "create the trigger-maintained due_calendar", _create_due_calendar),
+    (14, "create the lucky draw history tables", _create_lucky_draws),
+    (15, "create the inventory ledger", _create_inventory_ledger),
+    (16, "move operators into a reference table keyed by operator_id", _create_operators),
+    (17, "split product orders into headers and product_order_lines", _create_product_order_lines),
+    (18, "record when a delivery was claimed", _add_delivery_claimed_at),
+    (19, "re-place due dates only when recharge_day changes", _keep_reminders_on_client_edits),
+    (20, "count changes to lucky draw inputs", _create_lucky_draw_inputs),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Apply every pending migration, each in its own transaction.
+
+    Returns the schema version the database ends up at.
+    """
+    if current_version(conn) >= LATEST_VERSION:
+        return current_version(conn)
+
+    c = conn.cursor()
+    for version, name, apply in MIGRATIONS:
+        # BEGIN IMMEDIATE takes the write lock up front, so two processes
+        # starting together cannot both apply the same migration.
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            if current_version(conn) >= version:
+                c.execute("ROLLBACK")
+                continue
+            apply(c)
+            c.execute(f"PRAGMA user_version = {int(version)}")
+            c.execute("COMMIT")
+        except Exception:
+            c.execute("ROLLBACK")
+            raise
+    return current_version(conn)
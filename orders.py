@@ -0,0 +1,203 @@
+"""Write paths for recharge and product orders.
+
+Commission is computed here when an order is written and stored in
+orders.commission, so listings and totals read it instead of recomputing it.
+
+Product orders hold stock. Placing, editing, cancelling or deleting one moves
+products.stock in the same BEGIN IMMEDIATE transaction as the order and its
+lines (product_order_lines), and records the move in inventory_ledger. Stock
+is taken with a conditional UPDATE, so two counters ordering the last unit
+cannot both get it: the second finds too little stock and its whole
+transaction is rolled back. Every step is a primary-key lookup, so the write
+lock is held for well under a millisecond.
+"""
+from datetime import datetime
+
+from db import DEFAULT_DB_PATH, transaction
+
+
+def calculate_commission(amount, discount, rate):
+    commission = (amount * rate) - discount
+    return max(commission, 0)  # Ensure commission is not negative
+
+
+def add_recharge_order(client_id, amount, discount, rate, status="Pending", created_at=None, db_path=DEFAULT_DB_PATH):
+    commission = calculate_commission(amount, discount, rate)
+    created_at = created_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with transaction(db_path) as c:
+        c.execute(
+            "INSERT INTO orders (client_id, amount, discount, commission, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (client_id, amount, discount, commission, status, created_at)
+        )
+        return c.lastrowid
+
+
+def update_recharge_order(order_id, client_id, amount, discount, status, rate, db_path=DEFAULT_DB_PATH):
+    commission = calculate_commission(amount, discount, rate)
+    with transaction(db_path) as c:
+        c.execute(
+            "UPDATE orders SET client_id=?, amount=?, discount=?, commission=?, status=? WHERE id=?",
+            (client_id, amount, discount, commission, status, order_id)
+        )
+
+
+# --- Product orders ---
+
+MOVE_STOCK = """
+    UPDATE products SET stock = COALESCE(stock, 0) + :change
+    WHERE id = :product_id AND COALESCE(stock, 0) + :change >= 0
+    RETURNING stock
+"""
+HELD_STOCK = "SELECT product_id, -SUM(change) FROM inventory_ledger WHERE product_order_id = ? GROUP BY product_id"
+RECORD_MOVE = """
+    INSERT INTO inventory_ledger (product_id, change, stock_after, reason, product_order_id, created_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def held_stock(c, order_id):
+    """Return {product_id: quantity} the order holds, from its ledger rows,
+    or None for an order placed before stock was tracked (it has none)."""
+    rows = c.execute(HELD_STOCK, (order_id,)).fetchall()
+    return {product_id: int(held) for product_id, held in rows} if rows else None
+
+
+def move_stock(c, product_id, change, reason, product_order_id=None):
+    """Add ``change`` to a product's stock (negative takes it) and record it
+    in inventory_ledger, on the caller's transaction cursor ``c``.
+
+    Raises ValueError if the product does not exist or holds fewer than
+    -``change``. Stock given back to a deleted product is dropped.
+    """
+    if not change:
+        return
+    row = c.execute(MOVE_STOCK, {"product_id": product_id, "change": change}).fetchone()
+    if row is None:
+        found = c.execute("SELECT stock FROM products WHERE id = ?", (product_id,)).fetchone()
+        if found is None:
+            if change > 0:
+                return
+            raise ValueError(f"Product {product_id} not found.")
+        raise ValueError(f"Only {found[0] or 0} of product {product_id} in stock.")
+    c.execute(RECORD_MOVE, (product_id, change, row[0], reason, product_order_id, _now()))
+
+
+def _product_price(c, product_id):
+    row = c.execute("SELECT price FROM products WHERE id = ?", (product_id,)).fetchone()
+    if row is None:
+        raise ValueError(f"Product {product_id} not found.")
+    return row[0] or 0
+
+
+def _check_client(c, client_id):
+    if c.execute("SELECT 1 FROM clients WHERE id = ?", (client_id,)).fetchone() is None:
+        raise ValueError(f"Client {client_id} not found.")
+
+
+def _order_lines(lines):
+    lines = [(int(product_id), int(quantity)) for product_id, quantity in lines]
+    if not lines:
+        raise ValueError("An order needs at least one product.")
+    if any(quantity < 1 for _, quantity in lines):
+        raise ValueError("Quantity must be at least 1.")
+    return lines
+
+
+def _quantities(lines):
+    # Total quantity per product, for orders listing a product more than once.
+    quantities = {}
+    for product_id, quantity in lines:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    return quantities
+
+
+def _write_lines(c, order_id, lines, prices):
+    c.executemany(
+        "INSERT INTO product_order_lines (order_id, product_id, quantity, price) VALUES (?, ?, ?, ?)",
+        [(order_id, product_id, quantity, price) for (product_id, quantity), price in zip(lines, prices)]
+    )
+
+
+def place_product_order(client_id, lines, status="Pending", created_at=None, db_path=DEFAULT_DB_PATH):
+    """Record an order of ``lines`` ((product_id, quantity) pairs), each
+    priced at the product's current price, and take them from stock.
+    Returns the order id."""
+    lines = _order_lines(lines)
+    if status == "Cancelled":
+        raise ValueError("A new order cannot be cancelled.")
+    created_at = created_at or _now()
+    with transaction(db_path) as c:
+        _check_client(c, client_id)
+        prices = [_product_price(c, product_id) for product_id, _ in lines]
+        amount = sum(quantity * (price or 0) for (_, quantity), price in zip(lines, prices))
+        c.execute("INSERT INTO product_orders (client_id, amount, status, created_at) VALUES (?, ?, ?, ?)",
+                  (client_id, amount, status, created_at))
+        order_id = c.lastrowid
+        _write_lines(c, order_id, lines, prices)
+        for product_id, quantity in _quantities(lines).items():
+            move_stock(c, product_id, -quantity, "order", order_id)
+        return order_id
+
+
+def update_product_order(order_id, client_id, lines, status, db_path=DEFAULT_DB_PATH):
+    """Change an order's client, lines and status, and move stock by the
+    difference in what it holds: nothing once cancelled, otherwise its lines.
+
+    Lines kept as they were keep their price; changed ones are priced at the
+    current price. Orders placed before stock was tracked are changed without
+    moving stock.
+    """
+    lines = _order_lines(lines)
+    with transaction(db_path) as c:
+        old = c.execute("SELECT status FROM product_orders WHERE id = ?", (order_id,)).fetchone()
+        if old is None:
+            raise ValueError(f"Product order {order_id} not found.")
+        _check_client(c, client_id)
+        old_prices = {}
+        for product_id, quantity, price in c.execute(
+                "SELECT product_id, quantity, price FROM product_order_lines WHERE order_id = ? ORDER BY id", (order_id,)):
+            old_prices.setdefault((product_id, quantity), []).append(price)
+        prices = [old_prices[line].pop(0) if old_prices.get(line) else _product_price(c, line[0]) for line in lines]
+        amount = sum(quantity * (price or 0) for (_, quantity), price in zip(lines, prices))
+        c.execute("DELETE FROM product_order_lines WHERE order_id = ?", (order_id,))
+        _write_lines(c, order_id, lines, prices)
+
+        held = held_stock(c, order_id)
+        if held is not None:
+            reason = "cancel" if status == "Cancelled" and old[0] != "Cancelled" else "edit"
+            wanted = {} if status == "Cancelled" else _quantities(lines)
+            for product_id in sorted(held.keys() | wanted.keys()):
+                move_stock(c, product_id, held.get(product_id, 0) - wanted.get(product_id, 0), reason, order_id)
+        c.execute("UPDATE product_orders SET client_id=?, amount=?, status=? WHERE id=?",
+                  (client_id, amount, status, order_id))
+
+
+def _release(c, order_id, reason):
+    for product_id, quantity in (held_stock(c, order_id) or {}).items():
+        move_stock(c, product_id, quantity, reason, order_id)
+
+
+def cancel_product_order(order_id, db_path=DEFAULT_DB_PATH):
+    """Cancel an order and give back the stock it holds. Returns False if it
+    was already cancelled or does not exist."""
+    with transaction(db_path) as c:
+        row = c.execute(
+            "UPDATE product_orders SET status = 'Cancelled' WHERE id = ? AND status IS NOT 'Cancelled' RETURNING id",
+            (order_id,)
+        ).fetchone()
+        if row is None:
+            return False
+        _release(c, order_id, "cancel")
+        return True
+
+
+def delete_product_order(order_id, db_path=DEFAULT_DB_PATH):
+    """Delete an order and its lines, giving back the stock it holds."""
+    with transaction(db_path) as c:
+        c.execute("DELETE FROM product_orders WHERE id = ?", (order_id,))
+        c.execute("DELETE FROM product_order_lines WHERE order_id = ?", (order_id,))
+        _release(c, order_id, "delete")
@@ -0,0 +1,355 @@
+"""WhatsApp ad and alert delivery.
+
+``enqueue()`` records a message in the outbox and fans it out to one
+deliveries row per recipient with a single INSERT ... SELECT, so queuing a
+campaign to thousands of clients is one short transaction on the page's
+thread. Sending happens in a separate worker process:
+
+    python outbox.py worker
+
+The worker runs one asyncio task per gateway in config.json ("whatsapp").
+Each task claims due deliveries in batches, sends them through the
+gateway's transport at no more than its rate_per_second, and records the
+outcome. Failures are retried with exponential backoff until max_attempts,
+then marked Failed. Deliveries a stopped worker left in Sending are queued
+again when a worker starts, once their claim is older than
+claim_timeout_seconds.
+
+Transports are looked up in TRANSPORTS by the gateway's "transport" key.
+"http" posts JSON to the gateway's url; for local testing, run the stand-in
+gateway with
+
+    python outbox.py stub [--port 8765] [--fail-rate 0.1]
+
+Usage: python outbox.py {worker|stub} [--db PATH] [--port N] [--fail-rate F]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+import urllib.request
+import uuid
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from db import DEFAULT_DB_PATH, get_connection, transaction
+from settings import whatsapp_settings
+
+KINDS = ("ad", "alert", "reminder")
+POLL_SECONDS = 2            # idle wait when nothing is due
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+log = logging.getLogger(__name__)
+
+CLAIM = """
+    UPDATE deliveries SET status = 'Sending', gateway = ?, attempts = attempts + 1, claimed_at = ?
+    WHERE id IN (
+        SELECT id FROM deliveries
+        WHERE status = 'Queued' AND next_attempt_at <= ?
+        ORDER BY next_attempt_at LIMIT ?
+    )
+    RETURNING id, outbox_id, phone, attempts
+"""
+MARK_SENT = "UPDATE deliveries SET status = 'Sent', sent_at = ?, provider_id = ?, last_error = NULL WHERE id = ?"
+MARK_FAILED = "UPDATE deliveries SET status = ?, next_attempt_at = ?, last_error = ? WHERE id = ?"
+REQUEUE_ABANDONED = """
+    UPDATE deliveries SET status = 'Queued'
+    WHERE status = 'Sending' AND (claimed_at IS NULL OR claimed_at < ?)
+"""
+
+
+def _now():
+    return datetime.now().strftime(TIME_FORMAT)
+
+
+# --- Queuing ---
+
+def audience(target_group):
+    """Return the (where, params) selecting the clients in ``target_group``.
+
+    "All" is every client and "Premium" the premium ones; anything else is a
+    client group name.
+    """
+    if target_group == "All":
+        return [], []
+    if target_group == "Premium":
+        return ["c.premium = 1"], []
+    return ["c.group_name = ?"], [target_group]
+
+
+def fanout_sql(where, source="clients AS c"):
+    """Return the INSERT creating one delivery per client ``c`` of ``source``
+    matching ``where``."""
+    clauses = " AND ".join(["c.phone IS NOT NULL", "c.phone <> ''"] + list(where))
+    return f"""
+        INSERT INTO deliveries (outbox_id, client_id, phone, next_attempt_at)
+        SELECT ?, c.id, c.phone, ? FROM {source} WHERE {clauses}
+    """
+
+
+def queue(c, kind, message, target_group, where, params, title=None, source="clients AS c"):
+    """Queue ``message`` for the clients selected by ``where``, using the
+    caller's transaction cursor ``c``.
+
+    Returns (outbox id, number of recipients); nothing is queued, and the id
+    is None, when no client matches.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown message kind: {kind}")
+    now = _now()
+    c.execute(
+        "INSERT INTO outbox (kind, title, message, target_group, created_at) VALUES (?, ?, ?, ?, ?)",
+        (kind, title, message, target_group, now)
+    )
+    outbox_id = c.lastrowid
+    c.execute(fanout_sql(where, source), [outbox_id, now] + list(params))
+    recipients = c.rowcount
+    if not recipients:
+        c.execute("DELETE FROM outbox WHERE id = ?", (outbox_id,))
+        return None, 0
+    c.execute("UPDATE outbox SET recipients = ? WHERE id = ?", (recipients, outbox_id))
+    return outbox_id, recipients
+
+
+def enqueue(kind, message, target_group, title=None, db_path=DEFAULT_DB_PATH):
+    """Queue ``message`` for every client in ``target_group`` (see audience()).
+
+    Returns (outbox id, number of recipients).
+    """
+    where, params = audience(target_group)
+    with transaction(db_path) as c:
+        return queue(c, kind, message, target_group, where, params, title)
+
+
+# --- Claiming and recording ---
+
+def claim(gateway, limit, db_path=DEFAULT_DB_PATH):
+    """Mark up to ``limit`` due deliveries as Sending through ``gateway``.
+
+    Returns them as dicts of id, to, text and attempts (counting this one).
+    """
+    now = _now()
+    with transaction(db_path) as c:
+        rows = c.execute(CLAIM, (gateway, now, now, limit)).fetchall()
+    messages = _messages({outbox_id for _, outbox_id, _, _ in rows}, db_path)
+    return [{"id": id_, "to": phone, "text": messages[outbox_id], "attempts": attempts}
+            for id_, outbox_id, phone, attempts in sorted(rows)]
+
+
+def _messages(outbox_ids, db_path):
+    if not outbox_ids:
+        return {}
+    with get_connection(db_path) as conn:
+        return dict(conn.execute(
+            "SELECT id, message FROM outbox WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(sorted(outbox_ids)),)
+        ))
+
+
+def record(batch, results, max_attempts, retry_seconds, db_path=DEFAULT_DB_PATH):
+    """Store the outcome of sending ``batch``.
+
+    ``results`` holds one (ok, detail) per delivery, where detail is the
+    provider's message id on success and the error otherwise.
+    """
+    now = datetime.now()
+    sent, failed = [], []
+    for delivery, (ok, detail) in zip(batch, results):
+        if ok:
+            sent.append((now.strftime(TIME_FORMAT), detail, delivery["id"]))
+        else:
+            # Exponential backoff with jitter, so a gateway outage does not
+            # bring every retry back at the same moment.
+            delay = retry_seconds * 2 ** (delivery["attempts"] - 1) * random.uniform(1, 1.2)
+            status = "Failed" if delivery["attempts"] >= max_attempts else "Queued"
+            failed.append((status, (now + timedelta(seconds=delay)).strftime(TIME_FORMAT), str(detail)[:500],
+                           delivery["id"]))
+    with transaction(db_path) as c:
+        c.executemany(MARK_SENT, sent)
+        c.executemany(MARK_FAILED, failed)
+    return len(sent), len(failed)
+
+
+def requeue_interrupted(timeout_seconds, db_path=DEFAULT_DB_PATH):
+    """Put deliveries left in Sending by a worker that stopped back in the queue.
+
+    Only claims older than ``timeout_seconds`` are taken back; newer ones may
+    be a running worker's batch in flight.
+    """
+    cutoff = (datetime.now() - timedelta(seconds=timeout_seconds)).strftime(TIME_FORMAT)
+    with transaction(db_path) as c:
+        c.execute(REQUEUE_ABANDONED, (cutoff,))
+        return c.rowcount
+
+
+# --- Transports ---
+
+class HttpTransport:
+    """Posts batches as JSON to a gateway URL.
+
+    The gateway receives {"messages": [{"id", "to", "text"}]} and answers
+    {"results": [{"id", "ok", "provider_id" | "error"}]}.
+    """
+
+    def __init__(self, name, url, rate_per_second=20, batch_size=50, timeout=30, token=None, **_):
+        self.name = name
+        self.url = url
+        self.rate_per_second = rate_per_second
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.token = token
+
+    def _post(self, payload):
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        request = urllib.request.Request(self.url, json.dumps(payload).encode(), headers, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.load(response)
+
+    async def send(self, batch):
+        payload = {"messages": [{"id": d["id"], "to": d["to"], "text": d["text"]} for d in batch]}
+        # urllib blocks, so the request runs on a thread and other gateways
+        # keep sending meanwhile.
+        response = await asyncio.to_thread(self._post, payload)
+        results = {r["id"]: r for r in response.get("results", [])}
+        outcomes = []
+        for delivery in batch:
+            r = results.get(delivery["id"])
+            if r is None:
+                outcomes.append((False, "no result from gateway"))
+            elif r.get("ok"):
+                outcomes.append((True, r.get("provider_id")))
+            else:
+                outcomes.append((False, r.get("error", "rejected by gateway")))
+        return outcomes
+
+
+class LogTransport:
+    """Logs messages instead of sending them; for dry runs."""
+
+    def __init__(self, name, rate_per_second=100, batch_size=100, **_):
+        self.name = name
+        self.rate_per_second = rate_per_second
+        self.batch_size = batch_size
+
+    async def send(self, batch):
+        for delivery in batch:
+            log.info("[%s] to %s: %s", self.name, delivery["to"], delivery["text"])
+        return [(True, f"log-{delivery['id']}") for delivery in batch]
+
+
+TRANSPORTS = {
+    "http": HttpTransport,
+    "log": LogTransport,
+}
+
+
+def transports(settings=None):
+    settings = settings or whatsapp_settings()
+    return [TRANSPORTS[gateway.get("transport", "http")](**gateway) for gateway in settings["gateways"]]
+
+
+# --- Worker ---
+
+class RateLimiter:
+    """Token bucket allowing ``rate`` messages per second, in bursts of up to one second's worth."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    async def acquire(self, n):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # A batch bigger than the bucket waits for a full bucket and
+            # then overdraws it, which the next batches pay back.
+            if self.tokens >= min(n, self.rate):
+                self.tokens -= n
+                return
+            await asyncio.sleep((min(n, self.rate) - self.tokens) / self.rate)
+
+
+async def run_gateway(transport, settings, db_path=DEFAULT_DB_PATH, stop=None):
+    """Send due deliveries through ``transport`` until ``stop`` is set."""
+    limiter = RateLimiter(transport.rate_per_second)
+    # claim() and record() wait on the database's writer lock, so they run on
+    # a thread to keep the other gateways' sends moving meanwhile.
+    while stop is None or not stop.is_set():
+        batch = await asyncio.to_thread(claim, transport.name, transport.batch_size, db_path)
+        if not batch:
+            await asyncio.sleep(POLL_SECONDS)
+            continue
+        await limiter.acquire(len(batch))
+        try:
+            results = await transport.send(batch)
+        except Exception as e:
+            log.warning("Gateway %s failed a batch of %d: %s", transport.name, len(batch), e)
+            results = [(False, e)] * len(batch)
+        sent, failed = await asyncio.to_thread(record, batch, results, settings["max_attempts"],
+                                               settings["retry_seconds"], db_path)
+        log.info("Gateway %s: %d sent, %d failed", transport.name, sent, failed)
+
+
+async def run_worker(db_path=DEFAULT_DB_PATH, stop=None):
+    settings = whatsapp_settings()
+    requeued = requeue_interrupted(settings["claim_timeout_seconds"], db_path)
+    if requeued:
+        log.info("Requeued %d interrupted deliveries", requeued)
+    await asyncio.gather(*(run_gateway(t, settings, db_path, stop) for t in transports(settings)))
+
+
+# --- Local gateway stand-in ---
+
+def make_stub_handler(fail_rate=0.0, delay=0.0):
+    class StubGateway(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            time.sleep(delay)
+            results = []
+            for message in payload.get("messages", []):
+                if random.random() < fail_rate:
+                    results.append({"id": message["id"], "ok": False, "error": "stub: simulated failure"})
+                else:
+                    results.append({"id": message["id"], "ok": True, "provider_id": uuid.uuid4().hex})
+                    log.info("stub: to %s: %s", message["to"], message["text"])
+            body = json.dumps({"results": results}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            log.debug(format, *args)
+
+    return StubGateway
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send queued WhatsApp messages, or run a stand-in gateway.")
+    parser.add_argument("command", choices=["worker", "stub"])
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    parser.add_argument("--port", type=int, default=8765, help="stub: port to listen on")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="stub: fraction of messages to reject")
+    parser.add_argument("--delay", type=float, default=0.0, help="stub: seconds to wait before answering")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    if args.command == "worker":
+        try:
+            asyncio.run(run_worker(args.db))
+        except KeyboardInterrupt:
+            pass
+    else:
+        server = ThreadingHTTPServer(("127.0.0.1", args.port), make_stub_handler(args.fail_rate, args.delay))
+        print(f"Stub gateway on http://127.0.0.1:{args.port}/send")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
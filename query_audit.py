@@ -0,0 +1,200 @@
+"""Run EXPLAIN QUERY PLAN over every query the app issues.
+
+Usage: python query_audit.py [db_path]
+
+Exits non-zero if any query does a full table scan or sorts through a
+temporary B-tree, unless that table is listed with a reason it has to be read
+in full. Reads come straight from repository.py; keep the write statements
+in step with tabs/.
+"""
+import sys
+
+import exporter
+import lucky_draw
+import orders
+import outbox
+import repository
+import scheduler
+from db import DEFAULT_DB_PATH, get_connection
+
+_STATUS_DATES = repository.order_filters(status="Pending", start="2024-01-01", end="2024-02-01")[0]
+_CLIENT = repository.order_filters(client_id=1)[0]
+_CATEGORY = repository.product_filters(category="Mobiles", subcategory="Android", in_stock=True)[0]
+_PRICE = repository.product_filters(min_price=1000, max_price=5000)[0]
+_ELIGIBLE_ALL, _ELIGIBLE_ALL_PARAMS = lucky_draw.eligible_sql({"exclude_winners_days": 30})
+_ELIGIBLE_FILTERED, _ELIGIBLE_FILTERED_PARAMS = lucky_draw.eligible_sql(
+    {"active_this_month": True, "min_spend": 1000, "weighting": "recharge_volume"}
+)
+
+# (label, sql, params, allowed_scans). allowed_scans maps a table (or alias, as
+# EXPLAIN QUERY PLAN names it) to the reason reading it in full is expected;
+# every other table the query touches must be reached through an index. The
+# key "sort" allows sorting through a temporary B-tree.
+QUERIES = [
+    ("dashboard: total clients", repository.COUNT_CLIENTS, (), {"clients": "count of all rows"}),
+    ("dashboard: recharge totals", repository.RECHARGE_TOTALS, (), {
+        "daily_recharge_stats": "a few rollup rows per day, not one per order",
+        "sort": "grouping the rollup rows by status",
+    }),
+    ("dashboard: recharge trend", repository.RECHARGE_TREND, ("2024-01-01",), {}),
+    ("dashboard: clients due this week", repository.CLIENTS_DUE_BETWEEN, ("2024-01-01", "2024-01-08"), {}),
+    ("dashboard: pending recharge orders", repository.PENDING_ORDERS, (), {}),
+    ("dashboard: pending product orders", repository.PENDING_PRODUCT_ORDERS, (), {}),
+    ("dashboard: pending due recharges", repository.PENDING_DUE_CLIENTS, ("2024-01-01", "2024-01-01", "2024-02-01"), {}),
+    ("clients: page by name", repository.page_sql(repository.CLIENT_SOURCE, repository.CLIENT_COLUMNS, sort="name",
+                                                  descending=False, keyset=True), ("a", 1, 50), {}),
+    ("clients: page by name after NULL names", repository.page_sql(
+        repository.CLIENT_SOURCE, repository.CLIENT_COLUMNS, sort="name", descending=False, keyset=True,
+        after_null=True), (1, 50, 50, 50), {"sort": "merging the two limit-bounded ranges on either side of NULL names"}),
+    ("clients: page by id", repository.page_sql(repository.CLIENT_SOURCE, repository.CLIENT_COLUMNS, sort="id",
+                                                keyset=True), (1, 50), {}),
+    ("clients: count", repository.count_sql(repository.CLIENT_SOURCE), (), {"c": "count of all rows"}),
+    ("clients: search", repository.CLIENT_FTS_SEARCH, ('"abc"', 50), {
+        "hits": "the limit-bounded FTS hit list",
+        "sort": "ordering the bounded hits by score",
+    }),
+    ("clients: short search", repository.page_sql(repository.CLIENT_SOURCE, repository.CLIENT_COLUMNS,
+                                                  [repository.CLIENT_SEARCH], sort="name", descending=False),
+     ("%a%", "%a%", 50), {}),
+    ("clients: profile", repository.CLIENT_BY_ID, (1,), {}),
+    ("clients: profile with stats", repository.CLIENT_PROFILE, (1,), {}),
+    ("clients: recharge history", repository.CLIENT_ORDERS, (1,), {}),
+    ("clients: update", """UPDATE clients SET name=?, phone=?, group_name=?, operator_id=?, plan_amount=?, recharge_day=?,
+        premium=?, lucky_draw_wins=?, referred=?, referred_by_name=?, referred_by_phone=?, notes=? WHERE id=?""",
+     (None,) * 13, {}),
+    ("clients: delete", "DELETE FROM clients WHERE id=?", (1,), {}),
+    ("recharge orders: client name", repository.CLIENT_NAME, (1,), {}),
+    ("recharge orders: page", repository.page_sql("orders", repository.ORDER_COLUMNS, keyset=True),
+     ("x", 1, 50, 50, 50), {"sort": "merging the two limit-bounded ranges on either side of NULL created_at"}),
+    ("recharge orders: page by status and date", repository.page_sql("orders", where=_STATUS_DATES, keyset=True),
+     ("Pending", "2024-01-01", "2024-02-01", "x", 1, 50, "Pending", "2024-01-01", "2024-02-01", 50, 50), {"sort": "merging the two limit-bounded ranges on either side of NULL created_at"}),
+    ("recharge orders: page by client", repository.page_sql("orders", where=_CLIENT, keyset=True),
+     (1, "x", 1, 50, 1, 50, 50), {"sort": "merging the two limit-bounded ranges on either side of NULL created_at"}),
+    ("recharge orders: page after NULL created_at", repository.page_sql("orders", repository.ORDER_COLUMNS,
+                                                                        keyset=True, after_null=True), (1, 50), {}),
+    ("recharge orders: count by status and date", repository.count_sql("orders", _STATUS_DATES),
+     ("Pending", "2024-01-01", "2024-02-01"), {}),
+    ("recharge orders: fetch", repository.ORDER_BY_ID, (1,), {}),
+    ("recharge orders: update", "UPDATE orders SET client_id=?, amount=?, discount=?, commission=?, status=? WHERE id=?",
+     (1, 0, 0, 0, "Pending", 1), {}),
+    ("recharge orders: delete", "DELETE FROM orders WHERE id=?", (1,), {}),
+    ("product orders: page", repository.page_sql("product_orders", repository.PRODUCT_ORDER_COLUMNS, keyset=True),
+     ("x", 1, 50, 50, 50), {"sort": "merging the two limit-bounded ranges on either side of NULL created_at"}),
+    ("product orders: page by status and date", repository.page_sql("product_orders", repository.PRODUCT_ORDER_COLUMNS,
+                                                                    _STATUS_DATES, keyset=True),
+     ("Pending", "2024-01-01", "2024-02-01", "x", 1, 50, "Pending", "2024-01-01", "2024-02-01", 50, 50), {"sort": "merging the two limit-bounded ranges on either side of NULL created_at"}),
+    ("product orders: page by client", repository.page_sql("product_orders", repository.PRODUCT_ORDER_COLUMNS,
+                                                           _CLIENT, keyset=True),
+     (1, "x", 1, 50, 1, 50, 50), {"sort": "merging the two limit-bounded ranges on either side of NULL created_at"}),
+    ("product orders: fetch", repository.PRODUCT_ORDER_BY_ID, (1,), {}),
+    ("product orders: lines", repository.PRODUCT_ORDER_LINES, (1,), {}),
+    ("product orders: update", "UPDATE product_orders SET client_id=?, amount=?, status=? WHERE id=?",
+     (1, 1.0, "Pending", 1), {}),
+    ("product orders: replace lines", "DELETE FROM product_order_lines WHERE order_id = ?", (1,), {}),
+    ("product orders: cancel", "UPDATE product_orders SET status = 'Cancelled' WHERE id = ? AND status IS NOT 'Cancelled'",
+     (1,), {}),
+    ("product orders: delete", "DELETE FROM product_orders WHERE id = ?", (1,), {}),
+    ("product orders: move stock", orders.MOVE_STOCK, {"product_id": 1, "change": -1}, {}),
+    ("product orders: held stock", orders.HELD_STOCK, (1,), {"sort": "grouping one order's few ledger rows"}),
+    ("product catalogue: stock movements", repository.PRODUCT_STOCK_LEDGER, (1, 20), {}),
+    ("export: orders", exporter.export_sql("orders"), (), {"orders": "exports every order"}),
+    ("export: orders by status and date", exporter.export_sql("orders", _STATUS_DATES),
+     ("Pending", "2024-01-01", "2024-02-01"), {}),
+    ("export: product orders by status and date", exporter.export_sql("product_orders", _STATUS_DATES),
+     ("Pending", "2024-01-01", "2024-02-01"), {}),
+    ("export: clients", exporter.export_sql("clients"), (), {"c": "exports every client"}),
+    ("lucky draw: input versions", lucky_draw.INPUT_VERSIONS, (), {"lucky_draw_inputs": "one counter row per input"}),
+    ("lucky draw: eligible summary", f"SELECT COUNT(*), SUM(weight) FROM ({_ELIGIBLE_ALL}) WHERE weight > 0",
+     _ELIGIBLE_ALL_PARAMS, {"c": "every client is a candidate"}),
+    ("lucky draw: build pool", lucky_draw.POOL.format(eligible=_ELIGIBLE_ALL), _ELIGIBLE_ALL_PARAMS + ["[]"],
+     {"c": "every client is a candidate", "json_each": "the clients already drawn"}),
+    ("lucky draw: filtered pool", lucky_draw.POOL.format(eligible=_ELIGIBLE_FILTERED),
+     _ELIGIBLE_FILTERED_PARAMS + ["[]"], {"json_each": "the clients already drawn"}),
+    ("lucky draw: recent winners", repository.RECENT_LUCKY_DRAW_WINNERS, (50,),
+     {"w": "walks the primary key newest first and stops at the limit"}),
+    ("lucky draw: record win", "UPDATE clients SET lucky_draw_wins = lucky_draw_wins + 1 WHERE id = ?", (1,), {}),
+    ("scheduler: roll due dates forward", scheduler.ROLL_FORWARD, {"today": "2024-01-01"}, {}),
+    ("scheduler: queue reminders", outbox.fanout_sql(scheduler.REMINDER_WHERE, scheduler.REMINDER_SOURCE),
+     (1, "x", "2024-01-01"), {}),
+    ("scheduler: mark reminded", scheduler.MARK_REMINDED, ("2024-01-01",), {}),
+    ("whatsapp: client groups", repository.CLIENT_GROUPS, (), {}),
+    ("whatsapp: campaign progress", repository.OUTBOX_PROGRESS, ("ad", 20), {}),
+    ("whatsapp: fan-out to a group", outbox.fanout_sql(outbox.audience("Family")[0]), (1, "x", "Family"), {}),
+    ("whatsapp: fan-out to everyone", outbox.fanout_sql([]), (1, "x"), {"clients": "queues every client"}),
+    ("whatsapp: claim due deliveries", outbox.CLAIM, ("local", "x", "x", 50), {}),
+    ("whatsapp: requeue abandoned claims", outbox.REQUEUE_ABANDONED, ("x",), {}),
+    ("whatsapp: record sent", outbox.MARK_SENT, ("x", "x", 1), {}),
+    ("whatsapp: record failed", outbox.MARK_FAILED, ("Queued", "x", "x", 1), {}),
+    ("recharge catalogue: operators", repository.OPERATORS, (), {"operators": "a handful of reference rows"}),
+    ("recharge catalogue: by operator", repository.PLANS_BY_OPERATOR, (2,), {}),
+    ("recharge catalogue: all plans", repository.PLAN_LISTING, (), {"recharge_plans": "lists every plan"}),
+    ("recharge catalogue: update", "UPDATE recharge_plans SET name=?, data=?, voice=?, sms=?, validity=?, operator_id=?, price=?, description=? WHERE id=?",
+     (None,) * 9, {}),
+    ("recharge catalogue: delete", "DELETE FROM recharge_plans WHERE id=?", (1,), {}),
+    ("product catalogue: page by name", repository.page_sql("products", repository.PRODUCT_COLUMNS, sort="name",
+                                                            descending=False, keyset=True), ("a", 1, 50), {}),
+    ("product catalogue: page by category", repository.page_sql("products", repository.PRODUCT_COLUMNS, _CATEGORY,
+                                                                sort="name", descending=False, keyset=True),
+     ("Mobiles", "Android", "a", 1, 12), {}),
+    ("product catalogue: page by price", repository.page_sql("products", repository.PRODUCT_COLUMNS, _PRICE,
+                                                             sort="price", descending=False, keyset=True),
+     (1000, 5000, 1000, 1, 12), {}),
+    ("product catalogue: page by price after NULL prices", repository.page_sql(
+        "products", repository.PRODUCT_COLUMNS, _PRICE, sort="price", descending=False, keyset=True, after_null=True),
+     (1000, 5000, 1, 12, 1000, 5000, 12, 12), {"sort": "merging the two limit-bounded ranges on either side of NULL prices"}),
+    ("product catalogue: categories", repository.PRODUCT_CATEGORIES, (), {}),
+    ("product catalogue: subcategories", repository.PRODUCT_SUBCATEGORIES, ("Mobiles",), {}),
+    ("product catalogue: fetch", repository.PRODUCT_BY_ID, (1,), {}),
+    ("product catalogue: images", repository.PRODUCT_IMAGES, ("[1, 2, 3]",), {"json_each": "the requested product ids"}),
+    ("product catalogue: cover images", repository.PRODUCT_COVER_IMAGES, ("[1, 2, 3]",),
+     {"json_each": "the requested product ids"}),
+    ("product catalogue: update", "UPDATE products SET name=?, category=?, subcategory=?, price=?, description=? WHERE id=?",
+     (None,) * 6, {}),
+    ("product catalogue: replace images", "DELETE FROM product_images WHERE product_id = ?", (1,), {}),
+    ("images: backfill", """UPDATE product_images SET hash = ?, width = ?, height = ?, thumbnail_small = ?, thumbnail_large = ?
+        WHERE path = ? AND hash IS NULL""", (None,) * 6, {}),
+    ("product catalogue: delete", "DELETE FROM products WHERE id=?", (1,), {}),
+]
+
+
+def plan_problems(conn, sql, params, allowed_scans):
+    """Return the plan steps of ``sql`` that scan or sort without an index."""
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    problems = []
+    for _, _, _, detail in rows:
+        if "USE TEMP B-TREE" in detail:
+            if "sort" not in allowed_scans:
+                problems.append(detail)
+        elif "VIRTUAL TABLE INDEX" in detail and "M" in detail.rsplit(":", 1)[-1]:
+            continue  # an FTS5 MATCH served from the full-text index ("r": in rank order)
+        elif detail.startswith("SCAN (subquery-"):
+            continue  # the outer query reading its own subquery; that subquery's steps are checked on their own
+        elif detail.startswith("SCAN ") and " USING " not in detail:
+            if detail.split()[1] not in allowed_scans:
+                problems.append(detail)
+    return problems
+
+
+def audit(conn):
+    failures = []
+    for label, sql, params, allowed_scans in QUERIES:
+        problems = plan_problems(conn, sql, params, allowed_scans)
+        if problems:
+            failures.append(label)
+        print(f"{'FAIL' if problems else 'ok':<6} {label}")
+        for detail in problems:
+            print(f"         {detail}")
+        for table, reason in allowed_scans.items():
+            what = "temp B-tree sort" if table == "sort" else f"full scan of {table}"
+            print(f"         {what} allowed: {reason}")
+    return failures
+
+
+if __name__ == "__main__":
+    db_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB_PATH
+    with get_connection(db_path) as conn:
+        failures = audit(conn)
+    if failures:
+        print(f"\n{len(failures)} queries need an index: {', '.join(failures)}")
+        sys.exit(1)
+    print("\nAll queries are index-backed.")
@@ -0,0 +1,440 @@
+import json
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+import archive
+from db import DEFAULT_DB_PATH, get_manager
+
+# --- Cached reads ---
+# Every read the app makes goes through read_df(), which keeps results in a
+# process-wide LRU keyed on the SQL, its parameters and the write versions of
+# the tables it reads. Any committed INSERT/UPDATE/DELETE on one of those tables
+# changes the key, so a rerun only touches SQLite when the data really changed.
+
+CACHE_SIZE = 256
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def read_df(sql, tables, params=(), db_path=DEFAULT_DB_PATH):
+    """Run ``sql`` (which reads ``tables``) and return a DataFrame, cached.
+
+    Callers get their own copy, so adding or editing columns is safe.
+    """
+    manager = get_manager(db_path)
+    params = tuple(params)
+    key = (db_path, sql, params, manager.table_versions(tables))
+    with _cache_lock:
+        df = _cache.get(key)
+        if df is not None:
+            _cache.move_to_end(key)
+            return df.copy()
+
+    with manager.reader() as conn:
+        df = pd.read_sql_query(sql, conn, params=params)
+    with _cache_lock:
+        _cache[key] = df
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return df.copy()
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+# --- Keyset pagination ---
+# Pages are ordered by (sort, id) and continue from the last row of the previous
+# page, so fetching page N costs the same as page 1 when (sort) is indexed.
+# SQLite orders NULLs first: rows with a NULL sort value lead ascending pages
+# and trail descending ones.
+
+def _crosses_nulls(descending, after_null):
+    # Whether rows on both sides of the NULL / non-NULL boundary follow the cursor.
+    return descending != after_null
+
+
+def page_sql(source, select="*", where=(), sort="created_at", descending=True, keyset=False, after_null=False):
+    """Return SQL for one page of ``source`` ordered by (sort, id).
+
+    With ``keyset`` the page follows a cursor bound as (sort value, id), or as
+    id alone when sorting by id or when ``after_null`` (the cursor's sort
+    value is NULL). A row value comparison never matches NULLs, so a page that
+    crosses into or out of the NULLs reads the two sides as separate ranges
+    and keeps the first rows of both; ``where`` and the limit are then bound
+    once per range, followed by the limit again.
+    """
+    direction = "DESC" if descending else "ASC"
+    order = f"id {direction}" if sort == "id" else f"{sort} {direction}, id {direction}"
+    op = "<" if descending else ">"
+
+    def ranged(*keyset_clauses):
+        clauses = [f"({clause})" for clause in where] + list(keyset_clauses)
+        sql = f"SELECT {select} FROM {source}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        return sql + f" ORDER BY {order} LIMIT ?"
+
+    if not keyset:
+        return ranged()
+    if sort == "id":
+        return ranged(f"id {op} ?")
+    if after_null:
+        first, rest = ranged(f"{sort} IS NULL", f"id {op} ?"), ranged(f"{sort} IS NOT NULL")
+    else:
+        first, rest = ranged(f"({sort}, id) {op} (?, ?)"), ranged(f"{sort} IS NULL")
+    if not _crosses_nulls(descending, after_null):
+        return first
+    return f"SELECT * FROM ({first}) UNION ALL SELECT * FROM ({rest}) ORDER BY {order} LIMIT ?"
+
+
+def count_sql(source, where=()):
+    sql = f"SELECT COUNT(*) as cnt FROM {source}"
+    if where:
+        sql += " WHERE " + " AND ".join(f"({clause})" for clause in where)
+    return sql
+
+
+def read_page(source, tables, select="*", where=(), params=(), sort="created_at",
+              descending=True, after=None, limit=50):
+    """Return up to ``limit`` rows following the ``after`` cursor.
+
+    ``after`` is the (sort value, id) of the last row already shown, or None
+    for the first page. ``where`` clauses are ANDed and bound from ``params``.
+    """
+    after_null = after is not None and sort != "id" and pd.isna(after[0])
+    sql = page_sql(source, select, where, sort, descending, keyset=after is not None, after_null=after_null)
+    args = list(params)
+    if after is not None:
+        args += [after[1]] if sort == "id" or after_null else list(after)
+    args.append(limit)
+    if after is not None and sort != "id" and _crosses_nulls(descending, after_null):
+        args += list(params) + [limit, limit]
+    return read_df(sql, tables, args)
+
+
+def count_rows(source, tables, where=(), params=()):
+    return read_df(count_sql(source, where), tables, params).iloc[0]['cnt']
+
+
+# --- Dashboard ---
+COUNT_CLIENTS = "SELECT COUNT(*) as cnt FROM clients"
+# Recharge totals and trends come from daily_recharge_stats, which triggers
+# keep current, so their cost does not grow with the order history.
+RECHARGE_TOTALS = """
+    SELECT status, SUM(orders) AS orders, SUM(gross_amount) AS gross_amount,
+           SUM(discount) AS discount, SUM(commission) AS commission
+    FROM daily_recharge_stats GROUP BY status
+"""
+RECHARGE_TREND = """
+    SELECT day, status, orders, gross_amount, discount, commission
+    FROM daily_recharge_stats WHERE day >= ? ORDER BY day
+"""
+# Due lists read due_calendar, which holds each client's next due date with
+# month ends already resolved (scheduler.py keeps it current).
+# Operator names are looked up by primary key per row, in the select list only,
+# so client sources stay a single clients table for filters and keyset paging.
+OPERATOR_NAME = "(SELECT name FROM operators WHERE id = c.operator_id) AS operator"
+CLIENTS_DUE_BETWEEN = f"""
+    SELECT d.due_date, c.*, {OPERATOR_NAME} FROM due_calendar AS d JOIN clients AS c ON c.id = d.client_id
+    WHERE d.due_date >= ? AND d.due_date < ? ORDER BY d.due_date
+"""
+ORDER_COLUMNS = "id, client_id, amount, discount, commission, status, created_at"
+PENDING_ORDERS = f"SELECT {ORDER_COLUMNS} FROM orders WHERE status='Pending'"
+# Product orders are listed by header, with their lines summed up as
+# "product × quantity" from product_order_lines(order_id).
+PRODUCT_ORDER_COLUMNS = """id, client_id, amount, status, created_at,
+      (SELECT group_concat(l.product_id || ' × ' || l.quantity, ', ') FROM product_order_lines AS l
+       WHERE l.order_id = product_orders.id) AS items"""
+PRODUCT_ORDER_TABLES = ["product_orders", "product_order_lines"]
+PENDING_PRODUCT_ORDERS = f"SELECT {PRODUCT_ORDER_COLUMNS} FROM product_orders WHERE status='Pending' ORDER BY created_at DESC"
+# Clients due on a date with no 'Recharged' order in [start, end). The
+# created_at range (rather than strftime) lets orders(client_id, created_at)
+# answer each NOT EXISTS probe from the index.
+PENDING_DUE_CLIENTS = f"""
+    SELECT c.*, {OPERATOR_NAME} FROM due_calendar AS d JOIN clients AS c ON c.id = d.client_id
+    WHERE d.due_date = ?
+      AND NOT EXISTS (
+          SELECT 1 FROM orders AS o
+          WHERE o.client_id = c.id
+            AND o.status = 'Recharged'
+            AND o.created_at >= ? AND o.created_at < ?
+      )
+"""
+
+
+def count_clients():
+    return read_df(COUNT_CLIENTS, ["clients"]).iloc[0]['cnt']
+
+
+def recharge_totals_by_status():
+    return read_df(RECHARGE_TOTALS, ["daily_recharge_stats"])
+
+
+def recharge_trend(start_day):
+    return read_df(RECHARGE_TREND, ["daily_recharge_stats"], (start_day,))
+
+
+def clients_due_between(start, end):
+    """Return the clients due on dates in [start, end), with their due_date."""
+    return read_df(CLIENTS_DUE_BETWEEN, ["due_calendar", "clients", "operators"], (start, end))
+
+
+def pending_orders():
+    return read_df(PENDING_ORDERS, ["orders"])
+
+
+def pending_product_orders():
+    return read_df(PENDING_PRODUCT_ORDERS, PRODUCT_ORDER_TABLES)
+
+
+def pending_due_clients(due_date, start, end):
+    return read_df(PENDING_DUE_CLIENTS, ["due_calendar", "clients", "operators", "orders"], (due_date, start, end))
+
+
+# --- Clients ---
+# Order counters come from client_stats, which triggers keep current.
+CLIENT_SOURCE = "clients AS c LEFT JOIN client_stats AS s ON s.client_id = c.id"
+CLIENT_TABLES = ["clients", "client_stats", "operators"]
+CLIENT_COLUMNS = f"""c.*, {OPERATOR_NAME},
+      COALESCE(s.recharge_orders, 0) AS total_recharge_orders,
+      COALESCE(s.product_orders, 0) AS total_product_orders,
+      COALESCE(s.recharged_amount, 0) AS lifetime_recharge_amount,
+      s.last_recharge_at,
+      COALESCE(s.total_commission, 0) AS total_commission"""
+CLIENT_SEARCH = "name LIKE ? OR phone LIKE ?"
+# Ranked full-text search: every match is scored inside FTS5 and only the best
+# ``limit`` are joined to the client columns. Name and phone matches outrank
+# notes and group.
+CLIENT_FTS_SEARCH = f"""
+    WITH hits AS (
+        SELECT rowid AS id, rank AS score
+        FROM clients_fts WHERE clients_fts MATCH ? AND rank MATCH 'bm25(10.0, 10.0, 1.0, 1.0)'
+        ORDER BY rank LIMIT ?
+    )
+    SELECT {CLIENT_COLUMNS}
+    FROM hits
+    JOIN clients AS c ON c.id = hits.id
+    LEFT JOIN client_stats AS s ON s.client_id = c.id
+    ORDER BY hits.score
+"""
+# The trigram index needs at least three characters to match.
+FTS_MIN_TERM_LENGTH = 3
+CLIENT_BY_ID = f"SELECT c.*, {OPERATOR_NAME} FROM clients AS c WHERE c.id=?"
+CLIENT_PROFILE = f"SELECT {CLIENT_COLUMNS} FROM {CLIENT_SOURCE} WHERE c.id=?"
+CLIENT_NAME = "SELECT name FROM clients WHERE id=?"
+CLIENT_ORDERS = "SELECT * FROM orders WHERE client_id=? ORDER BY created_at DESC"
+
+
+def search_clients(search_term, limit=50):
+    """Return up to ``limit`` clients matching ``search_term``, best first.
+
+    Matches substrings of name, phone, notes and group through clients_fts.
+    Terms too short for the trigram index fall back to a bounded LIKE on
+    name and phone.
+    """
+    search_term = search_term.strip()
+    if len(search_term) < FTS_MIN_TERM_LENGTH:
+        pattern = f"%{search_term}%"
+        sql = page_sql(CLIENT_SOURCE, CLIENT_COLUMNS, [CLIENT_SEARCH], sort="name", descending=False)
+        return read_df(sql, CLIENT_TABLES, (pattern, pattern, limit))
+    # Quote the term as a single FTS phrase so user input is never parsed as
+    # query syntax.
+    phrase = '"' + search_term.replace('"', '""') + '"'
+    return read_df(CLIENT_FTS_SEARCH, CLIENT_TABLES, (phrase, limit))
+
+
+def get_client(client_id):
+    return read_df(CLIENT_BY_ID, ["clients", "operators"], (client_id,))
+
+
+def get_client_profile(client_id):
+    return read_df(CLIENT_PROFILE, CLIENT_TABLES, (client_id,))
+
+
+def client_name(client_id):
+    return read_df(CLIENT_NAME, ["clients"], (client_id,))
+
+
+def client_orders(client_id, include_archive=False):
+    """Return a client's recharge orders, newest first.
+
+    With ``include_archive`` the monthly archive partitions are read too.
+    """
+    partitions = archive.partitions("orders") if include_archive else []
+    if not partitions:
+        return read_df(CLIENT_ORDERS, ["orders"], (client_id,))
+    sql = archive.history_sql("orders", "client_id = ?", "created_at DESC", partitions)
+    return read_df(sql, ["orders", "partitions"] + partitions, (client_id,) * (len(partitions) + 1))
+
+
+# --- Recharge / product orders ---
+ORDER_BY_ID = "SELECT * FROM orders WHERE id=?"
+PRODUCT_ORDER_BY_ID = "SELECT * FROM product_orders WHERE id=?"
+PRODUCT_ORDER_LINES = "SELECT id, product_id, quantity, price FROM product_order_lines WHERE order_id=? ORDER BY id"
+
+
+def order_filters(status=None, start=None, end=None, client_id=None):
+    """Return the (where, params) for an order listing filtered by status,
+    a created_at range [start, end) and client."""
+    where, params = [], []
+    if status:
+        where.append("status = ?")
+        params.append(status)
+    if start:
+        where.append("created_at >= ?")
+        params.append(start)
+    if end:
+        where.append("created_at < ?")
+        params.append(end)
+    if client_id:
+        where.append("client_id = ?")
+        params.append(client_id)
+    return where, params
+
+
+def get_order(order_id):
+    return read_df(ORDER_BY_ID, ["orders"], (order_id,))
+
+
+def get_product_order(order_id):
+    return read_df(PRODUCT_ORDER_BY_ID, ["product_orders"], (order_id,))
+
+
+def product_order_lines(order_id):
+    return read_df(PRODUCT_ORDER_LINES, ["product_order_lines"], (order_id,))
+
+
+# --- Lucky draw ---
+RECENT_LUCKY_DRAW_WINNERS = """
+    SELECT w.draw_id, w.drawn_at, w.position, c.name, c.phone, w.weight, c.lucky_draw_wins
+    FROM lucky_draw_winners AS w LEFT JOIN clients AS c ON c.id = w.client_id
+    ORDER BY w.draw_id DESC, w.position DESC LIMIT ?
+"""
+
+
+def recent_lucky_draw_winners(limit=50):
+    """Return the winners of the latest draws, newest draw first."""
+    df = read_df(RECENT_LUCKY_DRAW_WINNERS, ["lucky_draw_winners", "clients"], (limit,))
+    return df.sort_values(["draw_id", "position"], ascending=[False, True], ignore_index=True)
+
+
+# --- WhatsApp outbox ---
+CLIENT_GROUPS = """
+    SELECT DISTINCT group_name FROM clients
+    WHERE group_name IS NOT NULL AND group_name <> '' ORDER BY group_name
+"""
+# Latest campaigns of one kind with their delivery counts, each count read
+# from deliveries(outbox_id, status).
+OUTBOX_PROGRESS = """
+    SELECT o.id, o.title, o.message, o.target_group, o.created_at, o.recipients,
+           (SELECT COUNT(*) FROM deliveries WHERE outbox_id = o.id AND status = 'Sent') AS sent,
+           (SELECT COUNT(*) FROM deliveries WHERE outbox_id = o.id AND status IN ('Queued', 'Sending')) AS pending,
+           (SELECT COUNT(*) FROM deliveries WHERE outbox_id = o.id AND status = 'Failed') AS failed
+    FROM outbox AS o WHERE o.kind = ? ORDER BY o.id DESC LIMIT ?
+"""
+
+
+def client_groups():
+    return read_df(CLIENT_GROUPS, ["clients"])['group_name'].tolist()
+
+
+def outbox_progress(kind, limit=20):
+    return read_df(OUTBOX_PROGRESS, ["outbox", "deliveries"], (kind, limit))
+
+
+# --- Catalogues ---
+OPERATORS = "SELECT id, name, image_path FROM operators ORDER BY id"
+PLANS_BY_OPERATOR = """
+    SELECT id, name, data, voice, sms, validity, price, description FROM recharge_plans
+    WHERE operator_id=? ORDER BY price
+"""
+PLAN_LISTING = "SELECT * FROM recharge_plans"
+PRODUCT_COLUMNS = "id, name, category, subcategory, price, stock, description"
+PRODUCT_BY_ID = f"SELECT {PRODUCT_COLUMNS} FROM products WHERE id=?"
+# Image metadata for a whole page of products in one primary-key lookup; the
+# ids are bound as a single JSON array so the statement text never changes.
+PRODUCT_IMAGES = """
+    SELECT product_id, sort_order, path, hash, width, height, thumbnail_small, thumbnail_large
+    FROM product_images
+    WHERE product_id IN (SELECT value FROM json_each(?))
+    ORDER BY product_id, sort_order
+"""
+PRODUCT_COVER_IMAGES = """
+    SELECT product_id, sort_order, path, hash, width, height, thumbnail_small, thumbnail_large
+    FROM product_images
+    WHERE product_id IN (SELECT value FROM json_each(?)) AND sort_order = 0
+"""
+# Newest first along idx_inventory_ledger_product_id (which ends in the rowid).
+PRODUCT_STOCK_LEDGER = """
+    SELECT created_at, change, stock_after, reason, product_order_id FROM inventory_ledger
+    WHERE product_id = ? ORDER BY id DESC LIMIT ?
+"""
+PRODUCT_CATEGORIES = "SELECT DISTINCT category FROM products WHERE category IS NOT NULL ORDER BY category"
+PRODUCT_SUBCATEGORIES = """
+    SELECT DISTINCT subcategory FROM products
+    WHERE category = ? AND subcategory IS NOT NULL ORDER BY subcategory
+"""
+
+
+def operators():
+    return read_df(OPERATORS, ["operators"])
+
+
+def plans_by_operator(operator_id):
+    return read_df(PLANS_BY_OPERATOR, ["recharge_plans"], (operator_id,))
+
+
+def list_plans():
+    return read_df(PLAN_LISTING, ["recharge_plans"])
+
+
+def get_product(product_id):
+    return read_df(PRODUCT_BY_ID, ["products"], (product_id,))
+
+
+def product_images(product_ids, cover_only=False):
+    """Return image metadata for ``product_ids``, ordered by product and position.
+
+    With ``cover_only`` only each product's first image is returned.
+    """
+    ids = json.dumps([int(product_id) for product_id in product_ids])
+    return read_df(PRODUCT_COVER_IMAGES if cover_only else PRODUCT_IMAGES, ["product_images"], (ids,))
+
+
+def product_stock_ledger(product_id, limit=20):
+    """Return the product's latest stock movements, newest first."""
+    return read_df(PRODUCT_STOCK_LEDGER, ["inventory_ledger"], (product_id, limit))
+
+
+def product_categories():
+    return read_df(PRODUCT_CATEGORIES, ["products"])['category'].tolist()
+
+
+def product_subcategories(category):
+    return read_df(PRODUCT_SUBCATEGORIES, ["products"], (category,))['subcategory'].tolist()
+
+
+def product_filters(category=None, subcategory=None, min_price=None, max_price=None, in_stock=False):
+    """Return the (where, params) for a product listing filtered by category,
+    subcategory, a price range [min_price, max_price] and availability."""
+    where, params = [], []
+    if category:
+        where.append("category = ?")
+        params.append(category)
+    if subcategory:
+        where.append("subcategory = ?")
+        params.append(subcategory)
+    if min_price is not None:
+        where.append("price >= ?")
+        params.append(min_price)
+    if max_price is not None:
+        where.append("price <= ?")
+        params.append(max_price)
+    if in_stock:
+        where.append("stock > 0")
+    return where, params
@@ -0,0 +1,38 @@
+"""Rebuild the trigger-maintained rollup tables from the order history.
+
+Usage: python rollups.py [db_path]
+
+The triggers keep client_stats and daily_recharge_stats current on every
+write; run this after editing orders outside the app with triggers disabled,
+or to check a rollup against the raw tables. Archived orders are included.
+"""
+import sys
+
+import archive
+from db import DEFAULT_DB_PATH, get_connection, transaction
+from migrations import rebuild_client_stats, rebuild_daily_recharge_stats
+
+
+def _with_archive(source, db_path):
+    names = archive.partitions(source, db_path)
+    if not names:
+        return source
+    # By name: partitions created before a hot column was dropped still have it.
+    with get_connection(db_path) as conn:
+        columns = ", ".join(col[1] for col in conn.execute(f"PRAGMA main.table_info({source})"))
+    return "(" + " UNION ALL ".join([f"SELECT {columns} FROM main.{source}"] +
+                                    [f"SELECT {columns} FROM {archive.ALIAS}.{name}" for name in names]) + ")"
+
+
+def rebuild(db_path=DEFAULT_DB_PATH):
+    orders = _with_archive("orders", db_path)
+    product_orders = _with_archive("product_orders", db_path)
+    with transaction(db_path) as c:
+        rebuild_client_stats(c, orders, product_orders)
+        rebuild_daily_recharge_stats(c, orders)
+
+
+if __name__ == "__main__":
+    db_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB_PATH
+    rebuild(db_path)
+    print(f"Rebuilt client_stats and daily_recharge_stats in {db_path}.")
@@ -0,0 +1,124 @@
+"""Daily recharge-due scheduling.
+
+due_calendar holds every client's next due date (see migration 13). Once a
+day ``run()``:
+
+- moves due dates that have passed to the client's next due date, with one
+  indexed UPDATE over the passed dates only;
+- queues a WhatsApp reminder, through the outbox, to the clients due
+  ``reminders.days_ahead`` days from now (config.json), once per due date.
+
+The dashboard then reads today's and this week's due lists straight from
+due_calendar. ``start()`` runs the job on a daemon thread at startup and after
+every midnight; it is safe to run from several processes, since each step is
+one transaction and reminders are only queued for clients not yet reminded.
+
+Usage: python scheduler.py [--date YYYY-MM-DD] [--db PATH]
+"""
+import argparse
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import outbox
+from db import DEFAULT_DB_PATH, transaction
+from migrations import due_date_sql
+from settings import reminder_settings
+
+DATE_FORMAT = "%Y-%m-%d"
+
+ROLL_FORWARD = f"""
+    UPDATE due_calendar
+    SET due_date = (SELECT {due_date_sql(':today', 'c.recharge_day')} FROM clients AS c WHERE c.id = client_id)
+    WHERE due_date < :today
+"""
+REMINDER_SOURCE = "due_calendar AS d JOIN clients AS c ON c.id = d.client_id"
+REMINDER_WHERE = ["d.due_date = ?", "d.reminded_for IS NOT d.due_date"]
+MARK_REMINDED = "UPDATE due_calendar SET reminded_for = due_date WHERE due_date = ?"
+
+log = logging.getLogger(__name__)
+
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def roll_forward(today=None, db_path=DEFAULT_DB_PATH):
+    """Move due dates before ``today`` to each client's next due date.
+
+    Returns the number of clients moved.
+    """
+    today = (today or date.today()).strftime(DATE_FORMAT)
+    with transaction(db_path) as c:
+        c.execute(ROLL_FORWARD, {"today": today})
+        return c.rowcount
+
+
+def queue_reminders(today=None, db_path=DEFAULT_DB_PATH, settings=None):
+    """Queue reminders for clients due ``days_ahead`` days after ``today``.
+
+    Clients already reminded for that due date are skipped. Returns
+    {due date: recipients}.
+    """
+    settings = settings or reminder_settings()
+    today = today or date.today()
+    queued = {}
+    # Every date up to the horizon, so a day the job did not run still gets
+    # its reminders, just late.
+    for ahead in range(int(settings["days_ahead"]) + 1):
+        due = (today + timedelta(days=ahead)).strftime(DATE_FORMAT)
+        message = settings["message"].format(due_date=(today + timedelta(days=ahead)).strftime("%d %b"))
+        with transaction(db_path) as c:
+            _, recipients = outbox.queue(c, "reminder", message, f"Due {due}", REMINDER_WHERE, [due],
+                                         title="Recharge reminder", source=REMINDER_SOURCE)
+            c.execute(MARK_REMINDED, (due,))
+        if recipients:
+            queued[due] = recipients
+    return queued
+
+
+def run(today=None, db_path=DEFAULT_DB_PATH):
+    """Bring due_calendar up to ``today`` and queue due reminders."""
+    today = today or date.today()
+    moved = roll_forward(today, db_path)
+    queued = queue_reminders(today, db_path)
+    return {"moved": moved, "reminders": queued}
+
+
+# --- Background scheduling ---
+
+def _seconds_to_midnight():
+    now = datetime.now()
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return (tomorrow - now).total_seconds() + 60
+
+
+def _run_daily(db_path):
+    while True:
+        try:
+            result = run(db_path=db_path)
+            log.info("Moved %d due dates; queued reminders %s", result["moved"], result["reminders"])
+        except Exception:
+            log.exception("Scheduled due-date run failed")
+        time.sleep(_seconds_to_midnight())
+
+
+def start(db_path=DEFAULT_DB_PATH):
+    """Start the daily scheduling thread, once per process."""
+    global _thread
+    with _thread_lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_run_daily, args=(db_path,), name="scheduler", daemon=True)
+            _thread.start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update recharge due dates and queue reminders.")
+    parser.add_argument("--date", type=date.fromisoformat, help="run as of this day (default: today)")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    args = parser.parse_args()
+
+    result = run(args.date, args.db)
+    print(f"Moved {result['moved']} due dates.")
+    for due, recipients in result["reminders"].items():
+        print(f"Queued reminders for {recipients} clients due {due}.")
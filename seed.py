@@ -0,0 +1,187 @@
+"""Fill a scratch database with synthetic clients, plans, products and orders.
+
+Volumes come from SCALES; "large" is the size we plan for (100k clients, 2M
+recharge orders). Data is generated from a fixed random seed, so a scale
+always produces the same database, and rows are written CHUNK_SIZE at a time
+through the normal schema, so the rollup and search triggers fill in as they
+would in production.
+
+Usage: python seed.py SCALE DB_PATH [--replace]
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from db import DEFAULT_DB_PATH, transaction
+from migrations import DEFAULT_OPERATORS as OPERATORS
+from orders import calculate_commission
+from settings import DEFAULT_COMMISSION_RATE
+
+CHUNK_SIZE = 10000
+SEED = 20240101
+HISTORY_DAYS = 730
+PENDING_DAYS = 3            # only orders this recent are still Pending
+
+SCALES = {
+    "small": {"clients": 1000, "plans": 50, "products": 200, "orders": 20000, "product_orders": 2000},
+    "medium": {"clients": 10000, "plans": 200, "products": 1000, "orders": 200000, "product_orders": 20000},
+    "large": {"clients": 100000, "plans": 500, "products": 5000, "orders": 2000000, "product_orders": 200000},
+}
+
+GROUPS = ["Family", "Friends", "Colleagues", "VIP", "Others"]
+PLAN_PRICES = [155, 199, 239, 299, 349, 479, 719, 839, 2999]
+FIRST_NAMES = ["Arun", "Priya", "Karthik", "Divya", "Suresh", "Lakshmi", "Vijay", "Meena", "Ravi", "Anitha",
+               "Ganesh", "Kavya", "Manoj", "Revathi", "Senthil", "Deepa", "Bala", "Geetha", "Hari", "Nandini"]
+LAST_NAMES = ["Kumar", "Raj", "Subramanian", "Krishnan", "Murugan", "Iyer", "Natarajan", "Pillai", "Reddy", "Das"]
+CATEGORIES = {
+    "Mobiles": ["Android", "iPhone", "Feature phones"],
+    "Accessories": ["Chargers", "Cables", "Cases", "Earphones"],
+    "Audio": ["Speakers", "Headphones"],
+    "Appliances": ["Fans", "Irons", "Mixers"],
+    "Cameras": [None],
+}
+
+
+def _clients(rng, count):
+    for i in range(count):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        referred = rng.random() < 0.2
+        yield (name, f"9{i:09d}", rng.choice(GROUPS), rng.choice(OPERATORS), rng.choice(PLAN_PRICES),
+               rng.randint(1, 31), int(rng.random() < 0.1), int(referred),
+               f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" if referred else None,
+               f"8{rng.randrange(10 ** 9):09d}" if referred else None, None)
+
+
+def _plans(rng, count):
+    for i in range(count):
+        price = rng.choice(PLAN_PRICES)
+        validity = rng.choice([28, 56, 84, 365])
+        yield (f"Plan {i + 1} ₹{price}", f"{rng.choice([1, 1.5, 2, 3])}GB/day", "Unlimited", "100/day", validity,
+               rng.choice(OPERATORS), price, f"{validity} days")
+
+
+def _products(rng, count):
+    for i in range(count):
+        category = rng.choice(list(CATEGORIES))
+        subcategory = rng.choice(CATEGORIES[category])
+        yield (f"{subcategory or category} {i + 1}", category, subcategory, round(rng.uniform(99, 90000), 2),
+               rng.choice([0, 0, rng.randint(1, 200)]), None)
+
+
+def _created_at(rng, now, max_days):
+    return (now - timedelta(seconds=rng.randrange(max_days * 86400))).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _orders(rng, count, clients, now):
+    for _ in range(count):
+        created_at = _created_at(rng, now, HISTORY_DAYS)
+        if created_at >= (now - timedelta(days=PENDING_DAYS)).strftime("%Y-%m-%d") and rng.random() < 0.3:
+            status = "Pending"
+        else:
+            status = "Failed" if rng.random() < 0.05 else "Recharged"
+        amount = rng.choice(PLAN_PRICES)
+        discount = rng.choice([0, 0, 0, 0.25, 0.5, 1])
+        yield (rng.randint(1, clients), amount, discount,
+               calculate_commission(amount, discount, DEFAULT_COMMISSION_RATE), status, created_at)
+
+
+def _product_orders(rng, count, clients, prices, now):
+    """Return (order headers, order lines); orders are numbered from 1, as
+    they are in a fresh database."""
+    orders, lines = [], []
+    for order_id in range(1, count + 1):
+        created_at = _created_at(rng, now, HISTORY_DAYS)
+        if created_at >= (now - timedelta(days=PENDING_DAYS)).strftime("%Y-%m-%d") and rng.random() < 0.5:
+            status = "Pending"
+        else:
+            status = "Cancelled" if rng.random() < 0.08 else "Completed"
+        amount = 0
+        for _ in range(rng.choice([1, 1, 1, 2, 3])):
+            product_id = rng.randint(1, len(prices))
+            quantity = rng.choice([1, 1, 1, 2, 3])
+            lines.append((order_id, product_id, quantity, prices[product_id - 1]))
+            amount += prices[product_id - 1] * quantity
+        orders.append((order_id, rng.randint(1, clients), round(amount, 2), status, created_at))
+    return orders, lines
+
+
+INSERTS = {
+    "clients": """INSERT INTO clients (name, phone, group_name, operator_id, plan_amount, recharge_day, premium, referred,
+                  referred_by_name, referred_by_phone, notes)
+                  VALUES (?, ?, ?, (SELECT id FROM operators WHERE name = ?), ?, ?, ?, ?, ?, ?, ?)""",
+    "plans": """INSERT INTO recharge_plans (name, data, voice, sms, validity, operator_id, price, description)
+                VALUES (?, ?, ?, ?, ?, (SELECT id FROM operators WHERE name = ?), ?, ?)""",
+    "products": "INSERT INTO products (name, category, subcategory, price, stock, description) VALUES (?, ?, ?, ?, ?, ?)",
+    "orders": """INSERT INTO orders (client_id, amount, discount, commission, status, created_at)
+                 VALUES (?, ?, ?, ?, ?, ?)""",
+    "product_orders": "INSERT INTO product_orders (id, client_id, amount, status, created_at) VALUES (?, ?, ?, ?, ?)",
+    "product_order_lines": "INSERT INTO product_order_lines (order_id, product_id, quantity, price) VALUES (?, ?, ?, ?)",
+}
+
+
+def _insert(db_path, kind, rows, on_progress=None):
+    chunk, written = [], 0
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            with transaction(db_path) as c:
+                c.executemany(INSERTS[kind], chunk)
+            written += len(chunk)
+            chunk = []
+            if on_progress:
+                on_progress(kind, written)
+    if chunk:
+        with transaction(db_path) as c:
+            c.executemany(INSERTS[kind], chunk)
+        written += len(chunk)
+        if on_progress:
+            on_progress(kind, written)
+    return written
+
+
+def seed(scale, db_path, now=None, on_progress=None):
+    """Create ``db_path`` at ``scale`` (a key of SCALES or a dict of row counts).
+
+    The file must not exist yet. Returns the row counts written.
+    """
+    if os.path.exists(db_path):
+        raise FileExistsError(f"{db_path} already exists")
+    counts = SCALES[scale] if isinstance(scale, str) else scale
+    rng = random.Random(SEED)
+    now = now or datetime.now().replace(microsecond=0)
+    written = {
+        "clients": _insert(db_path, "clients", _clients(rng, counts["clients"]), on_progress),
+        "plans": _insert(db_path, "plans", _plans(rng, counts["plans"]), on_progress),
+    }
+    products = list(_products(rng, counts["products"]))
+    written["products"] = _insert(db_path, "products", products, on_progress)
+    written["orders"] = _insert(db_path, "orders", _orders(rng, counts["orders"], counts["clients"], now), on_progress)
+    product_orders, lines = _product_orders(rng, counts["product_orders"], counts["clients"],
+                                            [p[3] for p in products], now)
+    written["product_orders"] = _insert(db_path, "product_orders", product_orders, on_progress)
+    written["product_order_lines"] = _insert(db_path, "product_order_lines", lines, on_progress)
+    with transaction(db_path) as c:
+        c.execute("ANALYZE")
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create a database filled with synthetic data.")
+    parser.add_argument("scale", choices=list(SCALES))
+    parser.add_argument("db_path")
+    parser.add_argument("--replace", action="store_true", help="delete db_path first if it exists")
+    args = parser.parse_args()
+
+    if os.path.abspath(args.db_path) == os.path.abspath(DEFAULT_DB_PATH):
+        parser.error("refusing to seed the live database")
+    if args.replace:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.db_path + suffix):
+                os.remove(args.db_path + suffix)
+    started = time.perf_counter()
+    counts = seed(args.scale, args.db_path,
+                  on_progress=lambda kind, rows: print(f"\r{kind}: {rows}", end="     ", flush=True))
+    print(f"\nSeeded {args.db_path} in {time.perf_counter() - started:.0f}s: "
+          + ", ".join(f"{rows} {kind}" for kind, rows in counts.items()))
@@ -0,0 +1,72 @@
+import json
+import os
+
+# --- App configuration (config.json) ---
+CONFIG_PATH = "config.json"
+DEFAULT_COMMISSION_RATE = 0.05
+DEFAULT_ARCHIVE_HORIZON_DAYS = 365
+DEFAULT_BACKUP = {"dir": "backups", "keep": 14, "interval_hours": 24}
+DEFAULT_REMINDERS = {
+    "days_ahead": 1,
+    "message": "Hi! Your mobile recharge is due on {due_date}. Reply to this message or visit "
+               "Sri Kailash Electronics to recharge.",
+}
+DEFAULT_WHATSAPP = {
+    "max_attempts": 5,
+    "retry_seconds": 30,
+    "claim_timeout_seconds": 600,   # a Sending delivery older than this was abandoned by its worker
+    "gateways": [
+        {"name": "local", "transport": "http", "url": "http://127.0.0.1:8765/send",
+         "rate_per_second": 20, "batch_size": 50},
+    ],
+}
+
+_configs = {}
+
+
+def load_config(path=CONFIG_PATH):
+    """Return the parsed config, re-reading the file only when its mtime changes.
+
+    The dict is shared between reruns and sessions; treat it as read-only.
+    """
+    mtime = os.stat(path).st_mtime_ns
+    entry = _configs.get(path)
+    if entry is None or entry[0] != mtime:
+        with open(path, "r") as f:
+            entry = _configs[path] = (mtime, json.load(f))
+    return entry[1]
+
+
+def commission_rate(config=None):
+    """Return the commission rate, as a fraction of the recharge amount."""
+    if config is None:
+        config = load_config()
+    return float(config.get("commission", {}).get("rate", DEFAULT_COMMISSION_RATE))
+
+
+def archive_horizon_days(config=None):
+    """Return how many days closed orders stay in the hot tables before archiving."""
+    if config is None:
+        config = load_config()
+    return int(config.get("archive", {}).get("horizon_days", DEFAULT_ARCHIVE_HORIZON_DAYS))
+
+
+def backup_settings(config=None):
+    """Return the backup directory, snapshots to keep and hours between snapshots."""
+    if config is None:
+        config = load_config()
+    return {**DEFAULT_BACKUP, **config.get("backup", {})}
+
+
+def whatsapp_settings(config=None):
+    """Return the outbox retry policy and the gateways messages are sent through."""
+    if config is None:
+        config = load_config()
+    return {**DEFAULT_WHATSAPP, **config.get("whatsapp", {})}
+
+
+def reminder_settings(config=None):
+    """Return how many days ahead recharge reminders go out, and their message."""
+    if config is None:
+        config = load_config()
+    return {**DEFAULT_REMINDERS, **config.get("reminders", {})}
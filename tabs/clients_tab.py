@@ -0,0 +1,162 @@
+import streamlit as st
+import sqlite3
+from db import transaction
+import repository
+from components import bulk_import, export_button, operator_select, paginated_table
+
+SEARCH_LIMIT = 50
+
+
+def show():
+    # --- Clients ---
+    st.title("👥 Clients Management")
+    search_term = st.text_input("Search Clients (Name, Phone, Notes or Group)")
+    if search_term.strip():
+        matches = repository.search_clients(search_term, limit=SEARCH_LIMIT)
+        if matches.empty:
+            st.info("No matching clients.")
+        else:
+            st.caption(f"Top {len(matches)} matches" if len(matches) == SEARCH_LIMIT else f"{len(matches)} matches")
+            st.dataframe(matches)
+    else:
+        paginated_table("clients", repository.CLIENT_SOURCE, repository.CLIENT_TABLES, select=repository.CLIENT_COLUMNS,
+                        sort_options=("name", "id"), empty_message="No clients found.")
+    
+    selected_client_id = st.number_input("Enter Client ID to View Details", min_value=0, step=1)
+    if selected_client_id > 0:
+        client_df = repository.get_client_profile(selected_client_id)
+        if not client_df.empty:
+            client = client_df.iloc[0]
+            st.markdown(f"### Client Profile: {client['name']} (ID: {client['id']})")
+            st.write(f"**Phone:** {client['phone']}")
+            st.write(f"**Group:** {client['group_name']}")
+            st.write(f"**Operator:** {client['operator']}")
+            st.write(f"**Plan Amount:** ₹{client['plan_amount']}")
+            st.write(f"**Recharge Day:** {client['recharge_day']}")
+            st.write(f"**Premium:** {'Yes' if client['premium'] else 'No'}")
+            st.write(f"**Lucky Draw Wins:** {client.get('lucky_draw_wins', 0)}")
+            st.write(f"**Referred:** {'Yes' if client.get('referred') else 'No'}")
+            st.write(f"**Referred By:** {client.get('referred_by_name', '')} ({client.get('referred_by_phone', '')})")
+            st.write(f"**Notes:** {client.get('notes', '')}")
+
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Recharge Orders", int(client['total_recharge_orders']))
+            col2.metric("Product Orders", int(client['total_product_orders']))
+            col3.metric("Lifetime Recharges (₹)", f"{client['lifetime_recharge_amount']:.2f}")
+            col4.metric("Commission (₹)", f"{client['total_commission']:.2f}")
+            st.write(f"**Last Recharge:** {client['last_recharge_at'] or 'Never'}")
+
+            if client['total_recharge_orders'] == 0:
+                st.info("No recharge orders for this client.")
+            else:
+                st.subheader("Recharge History")
+                include_archive = st.checkbox("Include archived orders", key="client_history_archive")
+                st.dataframe(repository.client_orders(selected_client_id, include_archive=include_archive))
+        else:
+            st.error("Client not found.")
+    
+    with st.expander("Add New Client"):
+        with st.form("add_client"):
+            name = st.text_input("Name")
+            phone = st.text_input("Phone")
+            group_options = ["Family", "Friends", "Colleagues", "VIP", "Others"]
+            group_name = st.selectbox("Group", group_options)
+            if group_name == "Others":
+                custom_group = st.text_input("Enter Custom Group")
+                final_group = custom_group
+            else:
+                final_group = group_name
+            operator_id = operator_select()
+            plan_amount = st.number_input("Plan Amount", min_value=0.0, step=1.0)
+            recharge_day = st.number_input("Recharge Day", min_value=1, max_value=31, step=1)
+            is_premium = st.selectbox("Premium?", ["No", "Yes"])
+            lucky_draw_wins = st.number_input("Lucky Draw Wins", min_value=0, step=1)
+            referred = st.selectbox("Referred?", ["No", "Yes"])
+            referred_by_name = st.text_input("Referred By Name") if referred == "Yes" else ""
+            referred_by_phone = st.text_input("Referred By Phone") if referred == "Yes" else ""
+            notes = st.text_area("Notes")
+            submitted = st.form_submit_button("Add Client")
+            if submitted:
+                premium_val = 1 if is_premium == "Yes" else 0
+                referred_val = 1 if referred == "Yes" else 0
+                if not name or not phone or not final_group:
+                    st.error("Name, Phone, and Group are required.")
+                else:
+                    try:
+                        with transaction() as c:
+                            c.execute(
+                                "INSERT INTO clients (name, phone, group_name, operator_id, plan_amount, recharge_day, premium, lucky_draw_wins, referred, referred_by_name, referred_by_phone, notes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                (name, phone, final_group, operator_id, plan_amount, recharge_day, premium_val, lucky_draw_wins, referred_val, referred_by_name, referred_by_phone, notes)
+                            )
+                        st.success("Client added successfully!")
+                    except sqlite3.IntegrityError:
+                        st.error("Phone number already exists.")
+    
+    with st.expander("📤 Export Clients"):
+        export_button("clients")
+
+    with st.expander("📥 Bulk Import Clients"):
+        bulk_import("clients")
+
+    with st.expander("Edit / Delete Client"):
+        edit_client_id = st.number_input("Enter Client ID", key="edit_client_id")
+        if st.button("Fetch Client Data", key="fetch_client"):
+            edit_client_df = repository.get_client(edit_client_id)
+            if edit_client_df.empty:
+                st.error("Client not found.")
+            else:
+                st.session_state.edit_client = edit_client_df.iloc[0].to_dict()
+                st.success("Client data fetched!")
+        if "edit_client" in st.session_state and isinstance(st.session_state.edit_client, dict):
+            data = st.session_state.edit_client
+            with st.form("update_client"):
+                new_name = st.text_input("Name", value=data["name"])
+                new_phone = st.text_input("Phone", value=data["phone"])
+                group_options = ["Family", "Friends", "Colleagues", "VIP", "Others"]
+                group_name = st.selectbox("Group", group_options,
+                                          index=group_options.index(data["group_name"]) if data["group_name"] in group_options else 0)
+                if group_name == "Others":
+                    custom_group = st.text_input("Custom Group", value=data["group_name"])
+                    final_group = custom_group
+                else:
+                    final_group = group_name
+                new_operator_id = operator_select(current=data.get("operator_id"))
+                new_plan_amount = st.number_input("Plan Amount", min_value=0.0, step=1.0, value=float(data.get("plan_amount", 0)))
+                new_recharge_day = st.number_input("Recharge Day", min_value=1, max_value=31, step=1, value=int(data.get("recharge_day", 1)))
+                is_premium = st.selectbox("Premium?", ["No", "Yes"], index=1 if data.get("premium") else 0)
+                new_lucky_draw_wins = st.number_input("Lucky Draw Wins", min_value=0, step=1, value=int(data.get("lucky_draw_wins", 0)))
+                referred = st.selectbox("Referred?", ["No", "Yes"], index=1 if data.get("referred") else 0)
+                new_referred_by_name = st.text_input("Referred By Name", value=data.get("referred_by_name", ""))
+                new_referred_by_phone = st.text_input("Referred By Phone", value=data.get("referred_by_phone", ""))
+                new_notes = st.text_area("Notes", value=data.get("notes", ""))
+                update_client = st.form_submit_button("Update Client")
+                if update_client:
+                    premium_val = 1 if is_premium == "Yes" else 0
+                    referred_val = 1 if referred == "Yes" else 0
+                    try:
+                        with transaction() as c:
+                            c.execute(
+                                """UPDATE clients SET name=?, phone=?, group_name=?, operator_id=?, plan_amount=?, recharge_day=?, 
+                                premium=?, lucky_draw_wins=?, referred=?, referred_by_name=?, referred_by_phone=?, notes=? WHERE id=?""",
+                                (new_name, new_phone, final_group, new_operator_id, new_plan_amount, new_recharge_day,
+                                 premium_val, new_lucky_draw_wins, referred_val, new_referred_by_name, new_referred_by_phone, new_notes, data["id"])
+                            )
+                        st.success("Client updated successfully!")
+                        del st.session_state.edit_client
+                    except sqlite3.IntegrityError as e:
+                        st.error("Update failed: " + str(e))
+            st.markdown("### Delete Client")
+            confirm_del = st.checkbox("Confirm deletion", key="confirm_del")
+            if st.button("Delete Client", key="delete_client"):
+                if confirm_del:
+                    try:
+                        with transaction() as c:
+                            c.execute("DELETE FROM clients WHERE id=?", (data["id"],))
+                        st.success("Client deleted successfully!")
+                        del st.session_state.edit_client
+                    except Exception as e:
+                        st.error("Deletion failed: " + str(e))
+                else:
+                    st.error("Please confirm deletion by checking the box.")
+        else:
+            st.info("Fetch a client to edit or delete.")
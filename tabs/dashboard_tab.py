@@ -0,0 +1,107 @@
+import streamlit as st
+from datetime import datetime, timedelta
+import repository
+
+TREND_DAYS = 30
+DUE_SOON_DAYS = 6
+
+
+def show():
+    # --- Dashboard ---
+    st.title("📊 Dashboard Overview")
+    total_clients = repository.count_clients()
+    totals = repository.recharge_totals_by_status()
+    total_orders = int(totals['orders'].sum())
+    # Only sum commission for 'Recharged' orders
+    total_commission = totals.loc[totals['status'] == 'Recharged', 'commission'].sum()
+
+    # Today's and the coming week's due clients, in one read of due_calendar.
+    today = datetime.today()
+    today_str = today.strftime("%Y-%m-%d")
+    due_week = repository.clients_due_between(
+        today_str, (today + timedelta(days=DUE_SOON_DAYS + 1)).strftime("%Y-%m-%d")
+    )
+    due_clients = due_week[due_week['due_date'] == today_str]
+    due_count = len(due_clients)
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Total Clients", total_clients)
+    col2.metric("Total Recharge Orders", total_orders)
+    col3.metric("Total Commission (₹)", f"{total_commission:.2f}")
+    col4.metric("Recharges Due Today", due_count)
+    
+    st.markdown("---")
+    st.markdown(f"### Last {TREND_DAYS} Days")
+    trend_start = (datetime.today() - timedelta(days=TREND_DAYS - 1)).strftime("%Y-%m-%d")
+    trend = repository.recharge_trend(trend_start)
+    if trend.empty:
+        st.info("No recharge orders in this period.")
+    else:
+        col1, col2 = st.columns(2)
+        col1.caption("Orders per day by status")
+        col1.bar_chart(trend.pivot_table(index='day', columns='status', values='orders', aggfunc='sum'))
+        recharged = trend[trend['status'] == 'Recharged'].set_index('day')
+        col2.caption("Recharged amount and commission per day (₹)")
+        col2.line_chart(recharged[['gross_amount', 'commission']])
+
+    st.markdown("### Pending Recharge Orders")
+    pending_orders = repository.pending_orders()
+    if not pending_orders.empty:
+        st.dataframe(pending_orders)
+    else:
+        st.info("No pending recharge orders.")
+    
+    st.markdown("### Pending Product Orders")
+    pending_product = repository.pending_product_orders()
+    if not pending_product.empty:
+        st.dataframe(pending_product)
+    else:
+        st.info("No pending product orders.")
+
+    # --- Pending Due Recharges ---
+    st.markdown("### Pending Due Recharges")
+
+    month_start = today.replace(day=1)
+    next_month_start = (month_start + timedelta(days=32)).replace(day=1)
+
+    # Clients due today with no 'Recharged' order this month, in one anti-join.
+    pending_due = repository.pending_due_clients(
+        today_str, month_start.strftime("%Y-%m-%d"), next_month_start.strftime("%Y-%m-%d")
+    )
+
+    if not due_clients.empty:
+        if not pending_due.empty:
+            st.dataframe(
+                pending_due[['id', 'name', 'phone', 'operator', 'plan_amount', 'recharge_day']]
+                .rename(columns={
+                    'id': 'Client ID',
+                    'name': 'Name',
+                    'phone': 'Phone',
+                    'operator': 'Operator',
+                    'plan_amount': 'Plan Amount',
+                    'recharge_day': 'Due Day'
+                })
+            )
+        else:
+            st.info("No pending due recharges for today.")
+    else:
+        st.info("No clients with recharge due today.")
+
+    # --- Due Soon ---
+    st.markdown(f"### Due in the Next {DUE_SOON_DAYS} Days")
+    due_soon = due_week[due_week['due_date'] > today_str]
+    if not due_soon.empty:
+        st.dataframe(
+            due_soon[['due_date', 'id', 'name', 'phone', 'operator', 'plan_amount']]
+            .rename(columns={
+                'due_date': 'Due Date',
+                'id': 'Client ID',
+                'name': 'Name',
+                'phone': 'Phone',
+                'operator': 'Operator',
+                'plan_amount': 'Plan Amount'
+            }),
+            hide_index=True
+        )
+    else:
+        st.info(f"No recharges due in the next {DUE_SOON_DAYS} days.")
@@ -0,0 +1,38 @@
+import streamlit as st
+import lucky_draw
+import repository
+
+def show():
+    # --- Lucky Draw ---
+    st.title("🎉 Lucky Draw")
+    st.markdown("#### Who can win")
+    col1, col2 = st.columns(2)
+    rules = {
+        "active_this_month": col1.checkbox("Recharged this month"),
+        "premium_only": col1.checkbox("Premium clients only"),
+        "min_spend": col2.number_input("Minimum lifetime recharges (₹)", min_value=0, step=100),
+        "exclude_winners_days": col2.number_input("Skip clients who won in the last N days", min_value=0, step=1),
+        "weighting": st.radio("Chances", list(lucky_draw.WEIGHTINGS), horizontal=True,
+                              format_func=lambda w: {"uniform": "Equal",
+                                                     "recharge_volume": "By recharge amount",
+                                                     "premium": f"Premium ×{lucky_draw.PREMIUM_WEIGHT}"}[w]),
+    }
+    eligible, _ = lucky_draw.eligible_summary(rules)
+    st.caption(f"{eligible} eligible clients.")
+    winners = st.number_input("Number of winners", min_value=1, value=1, step=1)
+
+    if st.button("Pick Lucky Winners!"):
+        draw_id, picked = lucky_draw.draw(int(winners), rules)
+        if draw_id is None:
+            st.warning("No clients available for lucky draw.")
+        else:
+            names = repository.recent_lucky_draw_winners(len(picked))
+            for _, winner in names.iterrows():
+                st.success(f"Winner #{winner['position']}: {winner['name']} ({winner['phone']})")
+
+    st.markdown("#### Recent Winners")
+    history = repository.recent_lucky_draw_winners()
+    if history.empty:
+        st.info("No draws yet.")
+    else:
+        st.dataframe(history, hide_index=True)
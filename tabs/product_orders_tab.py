@@ -0,0 +1,90 @@
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+import repository
+from components import export_button, order_filters, paginated_table
+from orders import cancel_product_order, delete_product_order, place_product_order, update_product_order
+
+LINE_COLUMNS = {
+    "product_id": st.column_config.NumberColumn("Product ID", min_value=1, step=1, required=True),
+    "quantity": st.column_config.NumberColumn("Quantity", min_value=1, step=1, default=1, required=True),
+}
+
+
+def line_editor(key, lines=()):
+    """Editable table of an order's (product_id, quantity) lines; returns the filled-in ones."""
+    frame = pd.DataFrame(list(lines) or [(None, 1)], columns=list(LINE_COLUMNS)).astype("Int64")
+    edited = st.data_editor(frame, key=key, num_rows="dynamic", column_config=LINE_COLUMNS, hide_index=True)
+    edited = edited.dropna()
+    return list(zip(edited["product_id"].astype(int), edited["quantity"].astype(int)))
+
+
+def show():
+    # --- Product Orders ---
+    st.title("📦 Product Orders")
+    with st.expander("Add New Product Order"):
+        with st.form("add_product_order"):
+            client_id = st.number_input("Client ID", min_value=1, step=1)
+            lines = line_editor("add_product_order_lines")
+            status = st.selectbox("Status", ["Pending", "Completed"])
+            created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            add_prod_order = st.form_submit_button("Add Product Order")
+            if add_prod_order:
+                try:
+                    place_product_order(client_id, lines, status, created_at)
+                    st.success("Product order added successfully!")
+                except Exception as e:
+                    st.error("Failed to add product order: " + str(e))
+    st.markdown("### Product Orders List")
+    where, params = order_filters("product_orders", ["Pending", "Completed", "Cancelled"])
+    with st.expander("📤 Export"):
+        st.caption("Exports every order matching the filters above.")
+        export_button("product_orders", where, params)
+    paginated_table("product_orders", "product_orders", repository.PRODUCT_ORDER_TABLES,
+                    select=repository.PRODUCT_ORDER_COLUMNS, where=where, params=params,
+                    empty_message="No product orders available.")
+    with st.expander("Edit / Delete Product Order"):
+        prod_order_id = st.number_input("Enter Product Order ID", min_value=1, step=1, key="prod_order_id")
+        if st.button("Fetch Order Data", key="fetch_prod_order"):
+            order_fetch = repository.get_product_order(prod_order_id)
+            if order_fetch.empty:
+                st.error("Product order not found.")
+            else:
+                st.session_state.prod_order = order_fetch.iloc[0].to_dict()
+                order_lines = repository.product_order_lines(prod_order_id)
+                st.session_state.prod_order["lines"] = list(zip(order_lines["product_id"], order_lines["quantity"]))
+                st.success("Product order data fetched!")
+        if "prod_order" in st.session_state:
+            order_data = st.session_state.prod_order
+            with st.form("update_prod_order_form"):
+                new_client_id = st.number_input("Client ID", min_value=1, value=int(order_data["client_id"]))
+                new_lines = line_editor(f"prod_order_lines_{order_data['id']}", order_data["lines"])
+                new_status = st.selectbox("Status", ["Pending", "Completed", "Cancelled"],
+                                          index=["Pending", "Completed", "Cancelled"].index(order_data["status"]))
+                update_order = st.form_submit_button("Update Product Order")
+                if update_order:
+                    try:
+                        update_product_order(order_data["id"], new_client_id, new_lines, new_status)
+                        st.success("Product order updated successfully!")
+                        del st.session_state.prod_order
+                    except Exception as e:
+                        st.error("Update failed: " + str(e))
+            if order_data["status"] != "Cancelled" and st.button("Cancel Product Order", key="cancel_prod_order"):
+                try:
+                    cancel_product_order(order_data["id"])
+                    st.success("Product order cancelled and its stock released.")
+                    del st.session_state.prod_order
+                except Exception as e:
+                    st.error("Cancellation failed: " + str(e))
+            st.markdown("### Delete Product Order")
+            confirm_prod_order_del = st.checkbox("Confirm deletion", key="confirm_prod_order_del")
+            if st.button("Delete Product Order", key="delete_prod_order"):
+                if confirm_prod_order_del:
+                    try:
+                        delete_product_order(order_data["id"])
+                        st.success("Product order deleted successfully!")
+                        del st.session_state.prod_order
+                    except Exception as e:
+                        st.error("Deletion failed: " + str(e))
+                else:
+                    st.error("Please confirm deletion by checking the box.")
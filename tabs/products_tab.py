@@ -1,9 +1,37 @@
 import streamlit as st
 import pandas as pd
-import os
-import json
+from db import transaction
+import images
+import repository
+from components import bulk_import, paginated_table, product_filters
+from orders import move_stock
 
-def show(conn, c):
+GRID_COLUMNS = 4
+
+
+def product_cards(page):
+    # Only the visible page is rendered, and each card loads a small cached
+    # thumbnail of the first image rather than the full photo. Cover images
+    # for the whole page come from one query.
+    covers = repository.product_images(page['id'], cover_only=True).set_index('product_id')['path']
+    for start in range(0, len(page), GRID_COLUMNS):
+        row = page.iloc[start:start + GRID_COLUMNS]
+        for col, (_, product) in zip(st.columns(GRID_COLUMNS), row.iterrows()):
+            with col.container(border=True):
+                cover = covers.get(product['id'])
+                thumb = images.thumbnail(cover) if cover else None
+                if thumb:
+                    st.image(thumb, width="stretch")
+                else:
+                    st.caption("No image")
+                st.markdown(f"**{product['name']}**")
+                st.caption(" / ".join(str(v) for v in (product['category'], product['subcategory']) if pd.notna(v) and v))
+                st.write(f"₹{product['price']:.2f}")
+                st.caption(f"In stock: {product['stock']}" if product['stock'] else "Out of stock")
+                st.caption(f"ID {product['id']}")
+
+
+def show():
     st.title("Product Catalogue")
 
     # --- Add New Product ---
@@ -18,39 +46,45 @@ def show(conn, c):
             image_files = st.file_uploader("Product Images", type=["png", "jpg", "jpeg"], accept_multiple_files=True)
             submitted = st.form_submit_button("Add Product")
             if submitted:
-                image_paths = []
-                if image_files:
-                    os.makedirs("product_images", exist_ok=True)
-                    for image_file in image_files:
-                        image_path = f"product_images/{name}_{image_file.name}"
-                        with open(image_path, "wb") as f:
-                            f.write(image_file.read())
-                        image_paths.append(image_path)
-                images_json = json.dumps(image_paths)
-                c.execute(
-                    "INSERT INTO products (name, category, subcategory, price, stock, description, image_paths) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                    (name, category, subcategory, price, stock, description, images_json)
-                )
-                conn.commit()
-                st.success("Product added!")
+                try:
+                    stored_images = images.store_uploads(image_files)
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    with transaction() as c:
+                        c.execute(
+                            "INSERT INTO products (name, category, subcategory, price, stock, description) VALUES (?, ?, ?, ?, ?, ?)",
+                            (name, category, subcategory, price, stock, description)
+                        )
+                        images.save_product_images(c, c.lastrowid, stored_images)
+                    st.success("Product added!")
+
+    with st.expander("📥 Bulk Import Products"):
+        bulk_import("products")
 
     # --- Product List ---
-    products_df = pd.read_sql_query(
-        "SELECT id, name, category, subcategory, price, stock, description, image_paths FROM products",
-        conn
-    )
-    if products_df.empty:
-        st.info("No products found.")
+    where, params = product_filters("products")
+    view = st.radio("View", ["Grid", "Table"], horizontal=True, key="products_view")
+    if view == "Grid":
+        paginated_table("products_grid", "products", ["products"], select=repository.PRODUCT_COLUMNS,
+                        where=where, params=params, sort_options=("name", "price", "id"), page_size=12,
+                        empty_message="No products found.", render=product_cards)
     else:
-        st.dataframe(products_df)
+        paginated_table("products", "products", ["products"], select=repository.PRODUCT_COLUMNS,
+                        where=where, params=params, sort_options=("name", "price", "id"),
+                        empty_message="No products found.")
 
     # --- Edit/Delete Section ---
     st.markdown("#### Edit or Delete a Product")
-    if not products_df.empty:
+    if repository.count_rows("products", ["products"]):
         product_id = st.number_input("Enter Product ID to Edit/Delete", min_value=1, step=1, key="edit_product_id")
-        selected_product = products_df[products_df['id'] == product_id]
+        selected_product = repository.get_product(product_id)
         if not selected_product.empty:
             product = selected_product.iloc[0]
+            current_images = repository.product_images([product_id])['path']
+            thumbnails = [thumb for thumb in map(images.thumbnail, current_images) if thumb]
+            if thumbnails:
+                st.image(thumbnails)
             with st.form("edit_product_form"):
                 name = st.text_input("Product Name", value=product['name'])
                 category = st.text_input("Category", value=product['category'])
@@ -61,25 +95,36 @@ def show(conn, c):
                 image_files = st.file_uploader("Product Images", type=["png", "jpg", "jpeg"], accept_multiple_files=True)
                 submitted = st.form_submit_button("Update Product")
                 if submitted:
-                    image_paths = json.loads(product['image_paths']) if product['image_paths'] else []
-                    if image_files:
-                        os.makedirs("product_images", exist_ok=True)
-                        image_paths = []
-                        for image_file in image_files:
-                            image_path = f"product_images/{name}_{image_file.name}"
-                            with open(image_path, "wb") as f:
-                                f.write(image_file.read())
-                            image_paths.append(image_path)
-                    images_json = json.dumps(image_paths)
-                    c.execute(
-                        "UPDATE products SET name=?, category=?, subcategory=?, price=?, stock=?, description=?, image_paths=? WHERE id=?",
-                        (name, category, subcategory, price, stock, description, images_json, product_id)
-                    )
-                    conn.commit()
-                    st.success("Product updated!")
+                    try:
+                        stored_images = images.store_uploads(image_files)
+                    except ValueError as e:
+                        st.error(str(e))
+                    else:
+                        try:
+                            with transaction() as c:
+                                c.execute(
+                                    "UPDATE products SET name=?, category=?, subcategory=?, price=?, description=? WHERE id=?",
+                                    (name, category, subcategory, price, description, product_id)
+                                )
+                                # Applied as a change from the stock shown, so orders placed
+                                # since the form loaded are not overwritten.
+                                move_stock(c, product_id, stock - int(product['stock']), "adjust")
+                                # New uploads replace the product's images; otherwise they are kept.
+                                if stored_images:
+                                    images.save_product_images(c, product_id, stored_images)
+                        except ValueError as e:
+                            st.error("Update failed: " + str(e))
+                        else:
+                            st.success("Product updated!")
+            with st.expander("Stock Movements"):
+                ledger = repository.product_stock_ledger(product_id)
+                if ledger.empty:
+                    st.info("No stock movements recorded.")
+                else:
+                    st.dataframe(ledger)
             if st.button("Delete Product"):
-                c.execute("DELETE FROM products WHERE id=?", (product_id,))
-                conn.commit()
+                with transaction() as c:
+                    c.execute("DELETE FROM products WHERE id=?", (product_id,))
                 st.success("Product deleted!")
     else:
         st.info("No products found.")
\ No newline at end of file
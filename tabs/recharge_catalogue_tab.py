@@ -1,14 +1,16 @@
 import streamlit as st
-import pandas as pd
+from db import transaction
+import repository
+from components import bulk_import, operator_select
 
-def show(conn, c):
+def show():
     st.title("Recharge Catalogue")
 
     # --- Add New Plan ---
     with st.expander("➕ Add New Recharge Plan"):
         with st.form(key="add_plan_form_main"):
             name = st.text_input("Plan Name")
-            operator = st.selectbox("Operator", ["Airtel", "Jio", "Vi", "BSNL"])
+            operator_id = operator_select(required=True)
             price = st.number_input("Price", min_value=0.0)
             validity = st.number_input("Validity (days)", min_value=1)
             data = st.text_input("Data")
@@ -17,31 +19,31 @@ def show(conn, c):
             description = st.text_area("Description")
             submitted = st.form_submit_button("Add Plan")
             if submitted:
-                c.execute(
-                    "INSERT INTO recharge_plans (name, data, voice, sms, validity, operator, price, description) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                    (name, data, voice, sms, validity, operator, price, description)
-                )
-                conn.commit()
+                with transaction() as c:
+                    c.execute(
+                        "INSERT INTO recharge_plans (name, data, voice, sms, validity, operator_id, price, description) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (name, data, voice, sms, validity, operator_id, price, description)
+                    )
                 st.success("Plan added!")
 
+    with st.expander("📥 Bulk Import Plans"):
+        bulk_import("plans")
+
     # --- Operator Tabs ---
-    operator_tabs = st.tabs(["Airtel", "Jio", "Vi", "BSNL"])
-    operators = ["Airtel", "Jio", "Vi", "BSNL"]
+    operators = repository.operators()
+    operator_tabs = st.tabs(operators["name"].tolist())
 
-    for idx, operator in enumerate(operators):
+    for idx, operator in enumerate(operators.itertuples()):
         with operator_tabs[idx]:
-            plans_df = pd.read_sql_query(
-                "SELECT id, name, data, voice, sms, validity, operator, price, description FROM recharge_plans WHERE operator=?",
-                conn, params=(operator,)
-            )
+            plans_df = repository.plans_by_operator(operator.id)
             if plans_df.empty:
-                st.info(f"No plans found for {operator}.")
+                st.info(f"No plans found for {operator.name}.")
             else:
                 st.dataframe(plans_df)
 
     # --- Edit/Delete Section ---
     st.markdown("#### Edit or Delete a Recharge Plan")
-    plans_df = pd.read_sql_query("SELECT * FROM recharge_plans", conn)
+    plans_df = repository.list_plans()
     if not plans_df.empty:
         plan_id = st.number_input("Enter Plan ID to Edit/Delete", min_value=1, step=1, key="edit_plan_id")
         selected_plan = plans_df[plans_df['id'] == plan_id]
@@ -49,7 +51,7 @@ def show(conn, c):
             plan = selected_plan.iloc[0]
             with st.form("edit_plan_form"):
                 name = st.text_input("Plan Name", value=plan['name'])
-                operator = st.selectbox("Operator", ["Airtel", "Jio", "Vi", "BSNL"], index=["Airtel", "Jio", "Vi", "BSNL"].index(plan['operator']))
+                operator_id = operator_select(current=plan['operator_id'], required=True)
                 price = st.number_input("Price", min_value=0.0, value=plan['price'])
                 validity = st.number_input("Validity (days)", min_value=1, value=plan['validity'])
                 data = st.text_input("Data", value=plan['data'])
@@ -58,15 +60,15 @@ def show(conn, c):
                 description = st.text_area("Description", value=plan['description'])
                 submitted = st.form_submit_button("Update Plan")
                 if submitted:
-                    c.execute(
-                        "UPDATE recharge_plans SET name=?, data=?, voice=?, sms=?, validity=?, operator=?, price=?, description=? WHERE id=?",
-                        (name, data, voice, sms, validity, operator, price, description, plan_id)
-                    )
-                    conn.commit()
+                    with transaction() as c:
+                        c.execute(
+                            "UPDATE recharge_plans SET name=?, data=?, voice=?, sms=?, validity=?, operator_id=?, price=?, description=? WHERE id=?",
+                            (name, data, voice, sms, validity, operator_id, price, description, plan_id)
+                        )
                     st.success("Plan updated!")
             if st.button("Delete Plan"):
-                c.execute("DELETE FROM recharge_plans WHERE id=?", (plan_id,))
-                conn.commit()
+                with transaction() as c:
+                    c.execute("DELETE FROM recharge_plans WHERE id=?", (plan_id,))
                 st.success("Plan deleted!")
     else:
         st.info("No recharge plans found.")
\ No newline at end of file
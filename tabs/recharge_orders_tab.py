@@ -0,0 +1,89 @@
+import streamlit as st
+import random
+from datetime import datetime
+from db import transaction
+import repository
+from components import export_button, order_filters, paginated_table
+from orders import add_recharge_order, update_recharge_order
+from settings import commission_rate
+
+
+def show(config):
+    # --- Recharge Orders ---
+    st.title("⚡ Recharge Orders")
+    with st.expander("Add New Recharge Order"):
+        with st.form("add_recharge_order"):
+            client_id = st.number_input("Client ID", min_value=1, step=1)
+            if client_id:
+                client_data = repository.client_name(client_id)
+                if not client_data.empty:
+                    st.write(f"Client Name: {client_data.iloc[0]['name']}")
+                else:
+                    st.error("Client ID not found.")
+            else:
+                st.error("Please enter a valid Client ID.")
+            
+            
+            amount = st.number_input("Amount (₹)", min_value=0.0, step=1.0)
+            discount = 0.0
+            if amount:
+                discount_min = config["discount"]["min"]
+                discount_max = config["discount"]["max"]
+                discount = round(amount * random.uniform(discount_min, discount_max), 2)
+            st.number_input("Discount (%)", value=discount, disabled=True, step=0.01)
+            status = st.selectbox("Status", ["Pending", "Recharged", "Failed"])
+            created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            add_order = st.form_submit_button("Add Recharge Order")
+            if add_order:
+                try:
+                    add_recharge_order(client_id, amount, discount, commission_rate(config), status, created_at)
+                    st.success("Recharge order added successfully!")
+                except Exception as e:
+                    st.error("Failed to add recharge order: " + str(e))
+    st.markdown("### Recharge Orders List")
+    where, params = order_filters("orders", ["Pending", "Recharged", "Failed"])
+    with st.expander("📤 Export"):
+        st.caption("Exports every order matching the filters above.")
+        export_button("orders", where, params)
+    paginated_table("orders", "orders", ["orders"], select=repository.ORDER_COLUMNS, where=where, params=params,
+                    empty_message="No recharge orders available.")
+    with st.expander("Edit / Delete Recharge Order"):
+        order_id = st.number_input("Enter Order ID", min_value=1, step=1, key="order_id")
+        if st.button("Fetch Order Data", key="fetch_order"):
+            order_fetch = repository.get_order(order_id)
+            if order_fetch.empty:
+                st.error("Order not found.")
+            else:
+                st.session_state.order_data = order_fetch.iloc[0].to_dict()
+                st.success("Order data fetched!")
+        if "order_data" in st.session_state:
+            order_data = st.session_state.order_data
+            with st.form("update_order_form"):
+                new_client_id = st.number_input("Client ID", min_value=1, value=int(order_data["client_id"]))
+                new_amount = st.number_input("Amount (₹)", min_value=0.0, step=1.0, value=float(order_data["amount"]))
+                new_discount = round(new_amount * random.uniform(0.0025, 0.0175), 2)
+                st.number_input("Discount (%)", value=new_discount, disabled=True, step=0.01)
+                new_status = st.selectbox("Status", ["Pending", "Recharged", "Failed"],
+                                          index=["Pending", "Recharged", "Failed"].index(order_data["status"]))
+                update_order = st.form_submit_button("Update Order")
+                if update_order:
+                    try:
+                        update_recharge_order(order_data["id"], new_client_id, new_amount, new_discount, new_status,
+                                              commission_rate(config))
+                        st.success("Order updated successfully!")
+                        del st.session_state.order_data
+                    except Exception as e:
+                        st.error("Update failed: " + str(e))
+            st.markdown("### Delete Order")
+            confirm_order_del = st.checkbox("Confirm deletion", key="confirm_order_del")
+            if st.button("Delete Order", key="delete_order"):
+                if confirm_order_del:
+                    try:
+                        with transaction() as c:
+                            c.execute("DELETE FROM orders WHERE id=?", (order_data["id"],))
+                        st.success("Order deleted successfully!")
+                        del st.session_state.order_data
+                    except Exception as e:
+                        st.error("Deletion failed: " + str(e))
+                else:
+                    st.error("Please confirm deletion.")
@@ -0,0 +1,21 @@
+import streamlit as st
+from components import audience_options, outbox_progress
+from outbox import enqueue
+
+def show():
+    # --- WhatsApp Ads ---
+    st.title("📢 WhatsApp Ads")
+    with st.form("send_ads"):
+        title = st.text_input("Ad Title")
+        message = st.text_area("Message")
+        group_name = st.selectbox("Target Group", audience_options())
+        submit_ads = st.form_submit_button("Send Ad")
+        if submit_ads:
+            if not message.strip():
+                st.error("Message cannot be empty.")
+            else:
+                _, recipients = enqueue("ad", message, group_name, title=title)
+                st.success(f"Ad queued for {recipients} clients.")
+
+    st.markdown("### Recent Ads")
+    outbox_progress("ad")
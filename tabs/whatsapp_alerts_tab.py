@@ -0,0 +1,20 @@
+import streamlit as st
+from components import audience_options, outbox_progress
+from outbox import enqueue
+
+def show():
+    # --- WhatsApp Alerts ---
+    st.title("📲 WhatsApp Alerts")
+    with st.form("send_alerts"):
+        alert_message = st.text_area("Alert Message")
+        recipient_group = st.selectbox("Recipient Group", audience_options())
+        submit_alert = st.form_submit_button("Send Alert")
+        if submit_alert:
+            if not alert_message.strip():
+                st.error("Alert message cannot be empty.")
+            else:
+                _, recipients = enqueue("alert", alert_message, recipient_group)
+                st.success(f"Alert queued for {recipients} clients.")
+
+    st.markdown("### Recent Alerts")
+    outbox_progress("alert")
@@ -0,0 +1,46 @@
+import sqlite3
+
+import pytest
+
+from migrations import migrate
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "recharge.db", isolation_level=None)
+    migrate(conn)
+    conn.execute("INSERT INTO clients (name, phone, recharge_day) VALUES ('a', '9000000001', 15)")
+    conn.execute("UPDATE due_calendar SET reminded_for = due_date")
+    yield conn
+    conn.close()
+
+
+def calendar(conn):
+    return conn.execute("SELECT client_id, due_date, reminded_for FROM due_calendar").fetchall()
+
+
+def test_edit_keeping_recharge_day_keeps_reminder(conn):
+    before = calendar(conn)
+    conn.execute("UPDATE clients SET name = 'b', recharge_day = 15 WHERE id = 1")
+    assert calendar(conn) == before
+
+
+def test_reimport_keeping_recharge_day_keeps_reminder(conn):
+    before = calendar(conn)
+    conn.execute("""
+        INSERT INTO clients (name, phone, recharge_day) VALUES ('b', '9000000001', 15)
+        ON CONFLICT (phone) DO UPDATE SET name = excluded.name, recharge_day = excluded.recharge_day
+    """)
+    assert calendar(conn) == before
+
+
+def test_changed_recharge_day_moves_due_date(conn):
+    conn.execute("UPDATE clients SET recharge_day = 20 WHERE id = 1")
+    [(client_id, due_date, reminded_for)] = calendar(conn)
+    assert due_date.endswith("-20")
+    assert reminded_for is None
+
+
+def test_cleared_recharge_day_drops_due_date(conn):
+    conn.execute("UPDATE clients SET recharge_day = NULL WHERE id = 1")
+    assert calendar(conn) == []